@@ -14,6 +14,18 @@ UNKNOWN_COUNTRY_CODE = 'UNKNOWN'
 UNKNOWN_COUNTRY = Country(UNKNOWN_COUNTRY_CODE, None, None, None)
 
 
+def _get_country_code_aliases():
+    aliases = {}
+    for alpha2, (alpha3, numeric) in countries.alt_codes.items():
+        if alpha2 in countries.countries:
+            aliases.update({alpha2: alpha2, alpha3: alpha2, str(numeric): alpha2})
+    return aliases
+
+
+# Maps every ISO 3166 code (alpha2, alpha3 and unpadded numeric) to the alpha2 code of its country
+COUNTRY_CODE_ALIASES = _get_country_code_aliases()
+
+
 def _get_country_property(code, property_name):
     return str(getattr(countries, property_name)(code))
 
@@ -32,3 +44,17 @@ def get_country(code):
         args.append(_get_country_property(code, property_name))
 
     return Country(name, *args)
+
+
+def get_alpha2(code):
+    """
+    Returns the two letter code of the country with the given ISO 3166 code (of any type),
+    or None if the country is unknown. Unlike get_country, this is a plain dictionary lookup.
+    """
+    if not code:
+        return None
+
+    code = code.upper()
+    if code.isdigit():
+        code = str(int(code))
+    return COUNTRY_CODE_ALIASES.get(code)
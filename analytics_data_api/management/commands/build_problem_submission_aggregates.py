@@ -0,0 +1,21 @@
+"""A command to aggregate the problem submissions of all courses after a pipeline load."""
+
+from django.core.management.base import BaseCommand
+
+from analytics_data_api.v0.models import ProblemSubmissionAggregate
+
+
+class Command(BaseCommand):
+    """A command to aggregate the problem submissions of all courses after a pipeline load."""
+
+    help = 'Rebuild the problem submission aggregates served by the problems endpoint from answer_distribution.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of aggregates inserted per query.')
+
+    def handle(self, *args, **options):
+        if ProblemSubmissionAggregate.create_table():
+            self.stdout.write('Created the problem_submission_aggregate table.')
+        num_aggregates = ProblemSubmissionAggregate.build(batch_size=options['batch_size'])
+        self.stdout.write(f'Aggregated the submissions of {num_aggregates} problems.')
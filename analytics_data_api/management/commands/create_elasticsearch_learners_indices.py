@@ -22,6 +22,10 @@ class Command(BaseCommand):
             es.indices.create(
                 index=settings.ELASTICSEARCH_LEARNERS_INDEX,
                 body={
+                    'settings': {
+                        # cache the aggregations of the course learner metadata on each shard (Elasticsearch 1.x)
+                        'index.cache.query.enable': True,
+                    },
                     'mappings': {
                         'roster_entry': {
                             'properties': {
@@ -0,0 +1,31 @@
+"""A command to report the response cache hits and misses of the API views."""
+
+from importlib import import_module
+
+from django.conf import settings
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics_data_api.v0.views import ResponseCacheMixin
+
+
+class Command(BaseCommand):
+    """A command to report the response cache hits and misses of the API views."""
+
+    help = 'Report the response cache hits and misses of each API view.'
+
+    def handle(self, *args, **options):
+        # The stats are counted in the response cache of the processes serving the API, which this
+        # process can only read if the cache is shared between processes.
+        if isinstance(ResponseCacheMixin.get_response_cache(), (DummyCache, LocMemCache)):
+            raise CommandError(
+                'The response cache is local to each process, so the stats of the API processes cannot be read. '
+                'Configure a shared cache backend (e.g. memcached) for RESPONSE_CACHE_ALIAS.'
+            )
+
+        # Load the URL configuration, so that all of the views are imported.
+        import_module(settings.ROOT_URLCONF)
+
+        for view, counts in sorted(ResponseCacheMixin.get_response_cache_stats().items()):
+            self.stdout.write(f'{view}: {counts["hits"]} hits, {counts["misses"]} misses')
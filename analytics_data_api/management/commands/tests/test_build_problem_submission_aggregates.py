@@ -0,0 +1,54 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from django_dynamic_fixture import G
+
+from analytics_data_api.v0 import models
+from analytics_data_api.v0.tests.utils import UnmanagedTablesMixin
+
+
+class BuildProblemSubmissionAggregatesTests(UnmanagedTablesMixin, TestCase):
+    unmanaged_models = (models.ProblemSubmissionAggregate,)
+
+    def testNormalRun(self):
+        course_id = 'edX/DemoX/Demo_Course'
+        module_id = 'i4x://test/problem/1'
+        G(models.ProblemSubmissionAggregate, course_id=course_id, module_id='i4x://test/problem/stale')
+        for part_id, correct, count in (('part_2', True, 4), ('part_1', True, 5), ('part_1', False, 3)):
+            G(models.ProblemFirstLastResponseAnswerDistribution, course_id=course_id, module_id=module_id,
+              part_id=part_id, correct=correct, last_response_count=count)
+
+        call_command('build_problem_submission_aggregates')
+
+        aggregate = models.ProblemSubmissionAggregate.objects.get()
+        self.assertEqual(aggregate.course_id, course_id)
+        self.assertEqual(aggregate.module_id, module_id)
+        self.assertEqual(aggregate.total_submissions, 6)
+        self.assertEqual(aggregate.correct_submissions, 4)
+        self.assertEqual(aggregate.part_ids, 'part_1,part_2')
+
+
+class CreateProblemSubmissionAggregatesTableTests(TransactionTestCase):
+    # The table is created outside of a transaction, as schema changes can't be made in one on SQLite.
+
+    def tearDown(self):
+        with connections[settings.ANALYTICS_DATABASE].schema_editor() as schema_editor:
+            schema_editor.delete_model(models.ProblemSubmissionAggregate)
+        super().tearDown()
+
+    def testCreatesTable(self):
+        G(models.ProblemFirstLastResponseAnswerDistribution, course_id='edX/DemoX/Demo_Course',
+          module_id='i4x://test/problem/1', part_id='part_1', correct=True, last_response_count=2)
+
+        out = StringIO()
+        call_command('build_problem_submission_aggregates', stdout=out)
+        self.assertIn('Created the problem_submission_aggregate table.', out.getvalue())
+        self.assertEqual(models.ProblemSubmissionAggregate.objects.get().total_submissions, 2)
+
+        out = StringIO()
+        call_command('build_problem_submission_aggregates', stdout=out)
+        self.assertNotIn('Created', out.getvalue())
+        self.assertEqual(models.ProblemSubmissionAggregate.objects.count(), 1)
@@ -0,0 +1,41 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from analytics_data_api.v0.views.course_summaries import CourseSummariesView
+
+
+class ResponseCacheStatsTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        # A cache shared between processes, as the stats are read by another process than the API's
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        cache_settings = dict(settings.CACHES)
+        cache_settings[settings.RESPONSE_CACHE_ALIAS] = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }
+        shared_cache = override_settings(CACHES=cache_settings)
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+
+    def testNormalRun(self):
+        view = CourseSummariesView()
+        view.increment_response_cache_stat('hits')
+        view.increment_response_cache_stat('hits')
+        view.increment_response_cache_stat('misses')
+
+        out = StringIO()
+        call_command('response_cache_stats', stdout=out)
+        self.assertEqual(out.getvalue(), 'CourseSummariesView: 2 hits, 1 misses\n')
+
+    def testLocalCache(self):
+        local_cache = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        with override_settings(CACHES=dict(settings.CACHES, **{settings.RESPONSE_CACHE_ALIAS: local_cache})):
+            with self.assertRaises(CommandError):
+                call_command('response_cache_stats')
@@ -0,0 +1,25 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django_dynamic_fixture import G
+
+from analytics_data_api.v0 import models
+from analytics_data_api.v0.views.course_summaries import CourseSummariesView
+
+
+class WarmCourseSummariesTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def testNormalRun(self):
+        course_id = 'edX/DemoX/Demo_Course'
+        G(models.CourseMetaSummaryEnrollment, course_id=course_id, enrollment_mode='verified', count=5)
+
+        call_command('warm_course_summaries')
+
+        version = CourseSummariesView().get_snapshot_version()
+        self.assertEqual(cache.get(CourseSummariesView.get_snapshot_key(version)), {course_id: 0})
+        summaries = cache.get(CourseSummariesView.get_snapshot_key(version, 0))
+        self.assertEqual(len(summaries), 1)
+        self.assertEqual(summaries[0]['count'], 5)
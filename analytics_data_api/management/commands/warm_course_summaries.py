@@ -0,0 +1,15 @@
+"""A command to prime the cached course summaries snapshot after a pipeline load."""
+
+from django.core.management.base import BaseCommand
+
+from analytics_data_api.v0.views.course_summaries import CourseSummariesView
+
+
+class Command(BaseCommand):
+    """A command to prime the cached course summaries snapshot after a pipeline load."""
+
+    help = 'Build and cache the course summaries snapshot for the currently loaded data.'
+
+    def handle(self, *args, **options):
+        summaries = CourseSummariesView.build_snapshot()
+        self.stdout.write(f'Cached summaries for {len(summaries)} courses.')
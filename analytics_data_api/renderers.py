@@ -3,7 +3,13 @@ Custom REST framework renderers common to all versions of the API.
 """
 
 
+from itertools import chain
+
+import unicodecsv as csv
+from django.conf import settings
 from ordered_set import OrderedSet
+from rest_framework.renderers import JSONRenderer
+from rest_framework_csv.misc import Echo
 from rest_framework_csv.renderers import CSVRenderer
 
 
@@ -96,3 +102,59 @@ class PaginatedCsvRenderer(ResultsOnlyRendererMixin, DynamicFieldsCsvRenderer):
     Render results-only CSV data with dynamically-determined fields.
     """
     media_type = 'text/csv'
+
+
+class StreamingJSONRenderer(JSONRenderer):
+    """
+    Render an iterable of items as a JSON array, one item at a time.
+
+    The rendered chunks are returned as a generator, for use with StreamingHttpResponse.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        yield b'['
+        for index, item in enumerate(data):
+            if index:
+                yield b','
+            yield super().render(item, accepted_media_type, renderer_context)
+        yield b']'
+
+
+class StreamingJSONObjectRenderer(JSONRenderer):
+    """
+    Render an iterable of (key, value) pairs as a JSON object, one pair at a time.
+
+    The rendered chunks are returned as a generator, for use with StreamingHttpResponse.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        yield b'{'
+        for index, (key, value) in enumerate(data):
+            if index:
+                yield b','
+            yield super().render(str(key), accepted_media_type, renderer_context)
+            yield b':'
+            yield super().render(value, accepted_media_type, renderer_context)
+        yield b'}'
+
+
+class StreamingDynamicFieldsCsvRenderer(DynamicFieldsCsvRenderer):
+    """
+    Render an iterable of items as CSV rows, one row at a time, with dynamically-determined fields.
+
+    The rendered rows are returned as a generator, for use with StreamingHttpResponse. Since
+    the items are not held in memory, the header fields are determined from the first item.
+    """
+
+    def render(self, data, media_type=None, renderer_context=None, writer_opts=None):
+        renderer_context = renderer_context or {}
+        data = iter(data)
+        first_item = next(data, None)
+        if first_item is None:
+            return
+
+        header = self.get_header([first_item], renderer_context)
+        encoding = renderer_context.get('encoding', settings.DEFAULT_CHARSET)
+        csv_writer = csv.writer(Echo(), encoding=encoding, **(self.writer_opts or {}))
+        for row in self.tablize(chain([first_item], data), header=header):
+            yield csv_writer.writerow(row)
@@ -6,7 +6,7 @@ from django.test import TestCase
 from django_dynamic_fixture import G
 from rest_framework.authtoken.models import Token
 
-from analytics_data_api.constants.country import UNKNOWN_COUNTRY, get_country
+from analytics_data_api.constants.country import UNKNOWN_COUNTRY, get_alpha2, get_country
 from analytics_data_api.utils import date_range, delete_user_auth_token, set_user_auth_token
 
 
@@ -93,6 +93,15 @@ class CountryTests(TestCase):
         self.assertEqual(get_country('A1'), UNKNOWN_COUNTRY)
         self.assertEqual(get_country(None), UNKNOWN_COUNTRY)
 
+    def test_get_alpha2(self):
+        for code in ('US', 'us', 'USA', '840'):
+            self.assertEqual(get_alpha2(code), 'US')
+
+        self.assertEqual(get_alpha2('036'), 'AU')
+        self.assertIsNone(get_alpha2('A1'))
+        self.assertIsNone(get_alpha2(''))
+        self.assertIsNone(get_alpha2(None))
+
 
 class DateRangeTests(TestCase):
     def test_empty_range(self):
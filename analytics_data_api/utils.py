@@ -62,12 +62,12 @@ def set_user_auth_token(user, key):
 
 
 def matching_tuple(answer):
-    """ Return tuple containing values which must match for consolidation. """
+    """ Return tuple containing values which must match for consolidation, from the values() of an answer. """
     return (
-        answer.question_text,
-        answer.answer_value,
-        answer.problem_display_name,
-        answer.correct,
+        answer['question_text'],
+        answer['answer_value'],
+        answer['problem_display_name'],
+        answer['correct'],
     )
 
 
@@ -1,9 +1,9 @@
 import datetime
-from itertools import groupby
+from itertools import groupby, islice
 
 from django.conf import settings
-from django.db import models
-from django.db.models import Case, Count, IntegerField, Max, Sum, When
+from django.db import connections, models, transaction
+from django.db.models import Case, Count, F, IntegerField, Max, Sum, When
 from django.utils.timezone import now
 # some fields (e.g. Float, Integer) are dynamic and your IDE may highlight them as unavailable
 from elasticsearch_dsl import Date, DocType, Float, Integer, Q, String  # pylint: disable=no-name-in-module
@@ -11,9 +11,16 @@ from elasticsearch_dsl import Date, DocType, Float, Integer, Q, String  # pylint
 from analytics_data_api.constants import country, genders, learner
 from analytics_data_api.constants.engagement_types import EngagementType
 from analytics_data_api.utils import date_range
+from analytics_data_api.v0.schema import has_first_last_answer_distribution
 
 
 class BaseCourseModel(models.Model):
+    """
+    Base model for the tables loaded by the data pipeline, which owns their schema and indexes.
+    The API has no migrations for them: their index_together entries document the indexes its
+    queries rely on, and are only applied to the tables migrate --run-syncdb creates for
+    development and tests.
+    """
     course_id = models.CharField(db_index=True, max_length=255)
     created = models.DateTimeField(auto_now_add=True)
 
@@ -26,7 +33,9 @@ class CourseActivityWeekly(BaseCourseModel):
 
     class Meta(BaseCourseModel.Meta):
         db_table = 'course_activity'
-        index_together = [['course_id', 'activity_type']]
+        # The latter index serves the lookups of the activity of the most recent interval of a course.
+        # Both are created by the pipeline (see BaseCourseModel).
+        index_together = [['course_id', 'activity_type'], ['course_id', 'interval_end', 'activity_type']]
         ordering = ('interval_end', 'interval_start', 'course_id')
         get_latest_by = 'interval_end'
 
@@ -36,9 +45,23 @@ class CourseActivityWeekly(BaseCourseModel):
     count = models.IntegerField()
 
     @classmethod
-    def get_most_recent(cls, course_id, activity_type):
-        """Activity for the week that was mostly recently computed."""
-        return cls.objects.filter(course_id=course_id, activity_type=activity_type).latest('interval_end')
+    def get_most_recent(cls, course_id, activity_type, latest_interval_end=None):
+        """
+        Activity for the week that was mostly recently computed. The end of that week may be given,
+        if already known, to look it up by index.
+        """
+        queryset = cls.objects.filter(course_id=course_id, activity_type=activity_type)
+        if latest_interval_end:
+            queryset = queryset.filter(interval_end=latest_interval_end)
+        return queryset.latest('interval_end')
+
+    @classmethod
+    def get_latest_interval_ends(cls, course_id):
+        """Returns the end of the most recent interval of each activity type of the course."""
+        return dict(
+            cls.objects.filter(course_id=course_id).order_by().values('activity_type')
+            .annotate(latest_interval_end=Max('interval_end')).values_list('activity_type', 'latest_interval_end')
+        )
 
 
 class BaseCourseEnrollment(BaseCourseModel):
@@ -187,6 +210,89 @@ class ProblemFirstLastResponseAnswerDistribution(BaseProblemResponseAnswerDistri
     last_response_count = models.IntegerField()
 
 
+class ProblemSubmissionAggregate(models.Model):
+    """
+    The submission counts and part IDs of each problem of a course, aggregated from the answer_distribution
+    table by the build_problem_submission_aggregates management command after each pipeline load.
+
+    Unlike the tables of BaseCourseModel, the table is not loaded by the pipeline, so the command creates it
+    in the analytics database (see create_table), with the unique index on (course_id, module_id) and the
+    index on course_id declared here. It is not managed by migrations, which the analytics database has none of.
+    """
+
+    class Meta:
+        managed = False
+        db_table = 'problem_submission_aggregate'
+        ordering = ('course_id', 'module_id')
+        unique_together = [('course_id', 'module_id')]
+
+    course_id = models.CharField(db_index=True, max_length=255)
+    module_id = models.CharField(max_length=255)
+    total_submissions = models.IntegerField(default=0)
+    correct_submissions = models.IntegerField(default=0)
+    # Comma-separated and sorted
+    part_ids = models.TextField()
+    # The most recent created date of the aggregated answer_distribution rows
+    created = models.DateTimeField()
+
+    @classmethod
+    def create_table(cls):
+        """Creates the table and its indexes in the analytics database if it does not exist, and returns whether it did."""
+        connection = connections[settings.ANALYTICS_DATABASE]
+        if cls._meta.db_table in connection.introspection.table_names():
+            return False
+        with connection.schema_editor() as schema_editor:
+            schema_editor.create_model(cls)
+        return True
+
+    @classmethod
+    def build(cls, batch_size=1000):
+        """
+        Replaces the aggregates with those of the rows currently loaded in answer_distribution,
+        and returns the number of problems aggregated.
+        """
+        if has_first_last_answer_distribution():
+            answers, count_field = ProblemFirstLastResponseAnswerDistribution.objects.order_by(), 'last_response_count'
+        else:
+            answers, count_field = ProblemResponseAnswerDistribution.objects.order_by(), 'count'
+
+        part_ids = {}
+        for course_id, module_id, part_id in answers.values_list('course_id', 'module_id', 'part_id').distinct() \
+                .order_by('course_id', 'module_id', 'part_id').iterator():
+            part_ids.setdefault((course_id, module_id), []).append(part_id)
+
+        # Each part of a problem counts its submissions, so the sums are divided by the number of parts
+        # to get the problem submissions, rather than the problem *part* submissions.
+        rows = answers.values('course_id', 'module_id').annotate(
+            submissions=Sum(count_field),
+            correct_submissions=Sum(Case(When(correct=True, then=F(count_field)), default=0,
+                                         output_field=IntegerField())),
+            num_parts=Count('part_id', distinct=True),
+            created=Max('created'),
+        ).order_by('course_id', 'module_id').iterator()
+        aggregates = (
+            cls(
+                course_id=row['course_id'],
+                module_id=row['module_id'],
+                total_submissions=row['submissions'] // row['num_parts'],
+                correct_submissions=row['correct_submissions'] // row['num_parts'],
+                part_ids=','.join(part_ids[(row['course_id'], row['module_id'])]),
+                created=row['created'],
+            )
+            for row in rows
+        )
+
+        num_aggregates = 0
+        with transaction.atomic(using=settings.ANALYTICS_DATABASE):
+            cls.objects.all().delete()
+            batch = list(islice(aggregates, batch_size))
+            while batch:
+                cls.objects.bulk_create(batch)
+                num_aggregates += len(batch)
+                batch = list(islice(aggregates, batch_size))
+        return num_aggregates
+
+
 class CourseEnrollmentByCountry(BaseCourseEnrollment):
     country_code = models.CharField(max_length=255, null=False, db_column='country_code')
 
@@ -208,6 +314,8 @@ class GradeDistribution(BaseCourseModel):
 
     class Meta(BaseCourseModel.Meta):
         db_table = 'grade_distribution'
+        # Not created by the API: must be added in the pipeline's schema (see BaseCourseModel)
+        index_together = [('course_id', 'module_id', 'grade')]
 
     module_id = models.CharField(db_index=True, max_length=255)
     grade = models.IntegerField()
@@ -220,6 +328,8 @@ class SequentialOpenDistribution(BaseCourseModel):
 
     class Meta(BaseCourseModel.Meta):
         db_table = 'sequential_open_distribution'
+        # Not created by the API: must be added in the pipeline's schema (see BaseCourseModel)
+        index_together = [('course_id', 'module_id')]
 
     module_id = models.CharField(db_index=True, max_length=255)
     count = models.IntegerField()
@@ -309,9 +419,15 @@ class RosterEntry(DocType):
         doc_type = 'roster_entry'
 
     @classmethod
-    def get_course_user(cls, course_id, username):
-        return cls.search().query('term', course_id=course_id).query(
-            'term', username=username).execute()
+    def get_course_user(cls, course_id, username, source_fields=None):
+        """
+        Returns the search results of the user in the course, reading only the `source_fields` of
+        the roster entry if given.
+        """
+        search = cls.search().query('term', course_id=course_id).query('term', username=username)
+        if source_fields is not None:
+            search = search.extra(_source={'include': source_fields})
+        return search.execute()
 
     @classmethod
     def get_users_in_course(
@@ -323,6 +439,7 @@ class RosterEntry(DocType):
             enrollment_mode=None,
             text_search=None,
             sort_policies=None,
+            source_fields=None,
     ):
         """
         Construct a search query for all users in `course_id` and return
@@ -332,6 +449,9 @@ class RosterEntry(DocType):
         Elements in the array are dicts with fields: order_by (field to sort by)
         and sort_order (either 'asc' or 'desc').  Default to 'username' and 'asc'.
 
+        If source_fields is given, only those fields of the roster entries, and
+        the fields they are sorted by, are returned.
+
         Raises `ValueError` if both `segments` and `ignore_segments` are provided.
         """
 
@@ -385,7 +505,10 @@ class RosterEntry(DocType):
         if text_search:
             search.query.must.append(Q('multi_match', query=text_search, fields=['name', 'username', 'email']))
 
-        # construct the sort hierarchy
+        # construct the sort hierarchy, ending with the username so that every learner has a distinct
+        # position, which cursor pagination relies on
+        if 'username' not in [sort_policy['order_by'] for sort_policy in sort_policies]:
+            sort_policies = sort_policies + [{'order_by': 'username', 'sort_order': 'asc'}]
         search_request = search.sort(*[
             {
                 sort_policy['order_by']: {
@@ -397,6 +520,10 @@ class RosterEntry(DocType):
             for sort_policy in sort_policies
         ])
 
+        if source_fields is not None:
+            sort_fields = [sort_policy['order_by'] for sort_policy in sort_policies]
+            search_request = search_request.extra(_source={'include': sorted(set(source_fields) | set(sort_fields))})
+
         return search_request
 
     @classmethod
@@ -421,7 +548,11 @@ class RosterEntry(DocType):
         # Use the configured default page size to set the number of aggregate search results.
         page_size = getattr(settings, 'AGGREGATE_PAGE_SIZE', 10)
 
-        search = cls.search()
+        # Only the aggregations are read, which lets Elasticsearch cache them on each shard until the
+        # index changes. This targets Elasticsearch 1.x, whose shard query cache only holds searches of the
+        # "count" type (its form of size=0) and is enabled by the index.cache.query.enable index setting
+        # (see create_elasticsearch_learners_indices).
+        search = cls.search().params(search_type='count')
         search.query = Q('bool', must=[Q('term', course_id=course_id)])
         search.aggs.bucket('enrollment_modes', 'terms', field='enrollment_mode', size=page_size)
         search.aggs.bucket('segments', 'terms', field='segments', size=page_size)
@@ -0,0 +1,40 @@
+"""
+Capabilities of the analytics database schema, which the pipeline may load in more than one version.
+
+The columns of the tables are introspected once per process, rather than on every request, and again
+after ANALYTICS_SCHEMA_CACHE_TIMEOUT seconds or when clear_schema_cache() is called.
+"""
+
+import time
+
+from django.conf import settings
+from django.db import connections
+
+_table_columns = {}
+
+
+def clear_schema_cache():
+    """Forgets the introspected columns, e.g. after the pipeline has changed the schema."""
+    _table_columns.clear()
+
+
+def get_table_columns(table_name):
+    """Returns the set of the names of the columns of the given table of the analytics database."""
+    timeout = getattr(settings, 'ANALYTICS_SCHEMA_CACHE_TIMEOUT', None)
+    introspected_at, columns = _table_columns.get(table_name, (None, None))
+    if columns is None or (timeout is not None and time.monotonic() - introspected_at > timeout):
+        connection = connections[settings.ANALYTICS_DATABASE]
+        with connection.cursor() as cursor:
+            columns = frozenset(
+                column.name for column in connection.introspection.get_table_description(cursor, table_name)
+            )
+        _table_columns[table_name] = (time.monotonic(), columns)
+    return columns
+
+
+def has_first_last_answer_distribution():
+    """
+    Whether the answer_distribution table counts the first and last attempts at problems
+    (ProblemFirstLastResponseAnswerDistribution), rather than only the last (ProblemResponseAnswerDistribution).
+    """
+    return 'last_response_count' in get_table_columns('answer_distribution')
@@ -1,8 +1,14 @@
+import base64
+import json
 from collections import OrderedDict
+from itertools import chain
 
 from django.conf import settings
+from elasticsearch_dsl import F
 from rest_framework import pagination, serializers
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from six.moves.urllib.parse import urljoin  # pylint: disable=import-error,ungrouped-imports
 
 from analytics_data_api.constants import engagement_events, enrollment_modes
@@ -156,6 +162,28 @@ class ConsolidatedFirstLastAnswerDistributionSerializer(ProblemFirstLastResponse
         return distribution
 
 
+def represent_answer_distributions(answers, serializer_class):
+    """
+    Returns the representations of answer distribution rows read with values(), as `serializer_class`
+    (ConsolidatedAnswerDistributionSerializer or ConsolidatedFirstLastAnswerDistributionSerializer) represents
+    them, without the per-field overhead of a serializer. Rows without consolidated_variant were not consolidated.
+    """
+    created_field = serializers.DateTimeField(format=settings.DATETIME_FORMAT)
+    fields = serializer_class.Meta.fields
+    representations = []
+    for answer in answers:
+        representation = OrderedDict()
+        for field in fields:
+            if field == 'created':
+                representation[field] = created_field.to_representation(answer[field])
+            elif field == 'consolidated_variant':
+                representation[field] = answer.get(field, False)
+            else:
+                representation[field] = answer[field]
+        representations.append(representation)
+    return representations
+
+
 class GradeDistributionSerializer(ModelSerializerWithCreatedField):
     """
     Representation of the grade_distribution table without id
@@ -338,8 +366,46 @@ class LastUpdatedSerializer(serializers.Serializer):
     last_updated = serializers.DateTimeField(source='date', format=settings.DATE_FORMAT)
 
 
+class DynamicFieldsSerializerMixin:
+    """
+    A Serializer mixin that takes additional `fields` and/or `exclude` keyword arguments that control which
+    fields should be displayed.
+
+    Blatantly taken from http://www.django-rest-framework.org/api-guide/serializers/#dynamically-modifying-fields
+
+    If a field name is specified in both `fields` and `exclude`, then the exclude option takes precedence and the field
+    will not be included in the serialized result.
+
+    Keyword Arguments:
+        fields  -- list of field names on the model to include in the serialized result
+        exclude -- list of field names on the model to exclude in the serialized result
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Don't pass the 'fields' arg up to the superclass
+        fields = kwargs.pop('fields', None)
+        exclude = kwargs.pop('exclude', None)
+
+        # Instantiate the superclass normally
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            # Drop any fields that are not specified in the `fields` argument.
+            allowed = set(fields)
+            existing = set(self.fields.keys())
+            for field_name in existing - allowed:
+                self.fields.pop(field_name)
+
+        if exclude is not None:
+            # Drop any fields that are specified in the `exclude` argument.
+            disallowed = set(exclude)
+            existing = set(self.fields.keys())
+            for field_name in existing & disallowed:  # intersection
+                self.fields.pop(field_name)
+
+
 # pylint: disable=abstract-method
-class LearnerSerializer(serializers.Serializer):
+class LearnerSerializer(DynamicFieldsSerializerMixin, serializers.Serializer):
     user_id = serializers.IntegerField()
     username = serializers.CharField()
     enrollment_mode = serializers.CharField()
@@ -359,6 +425,34 @@ class LearnerSerializer(serializers.Serializer):
     engagements = serializers.SerializerMethodField()
     enrollment_date = serializers.DateTimeField(format=settings.DATE_FORMAT)
     cohort = serializers.SerializerMethodField()
+    last_updated = serializers.SerializerMethodField()
+
+    # The fields of the roster entries that each field is serialized from, when not the field of the same name
+    source_fields = {
+        'account_url': ['username'],
+        'engagements': [
+            'discussion_contributions', 'problems_attempted', 'problems_completed', 'videos_viewed',
+            'problem_attempts_per_completed',
+        ],
+        'last_updated': [],
+    }
+
+    @classmethod
+    def get_source_fields(cls, fields=None, exclude=None):
+        """
+        Returns the fields of the roster entries needed to serialize the given `fields` and/or `exclude`
+        keyword arguments.
+        """
+        field_names = set(cls._declared_fields)  # pylint: disable=no-member
+        if fields is not None:
+            field_names &= set(fields)
+        if exclude is not None:
+            field_names -= set(exclude)
+        return sorted(set(chain.from_iterable(cls.source_fields.get(name, [name]) for name in field_names)))
+
+    def get_last_updated(self, obj):  # pylint: disable=unused-argument
+        # The time the roster was last updated is the same for all the learners, so it is given in the context.
+        return self.context.get('last_updated')
 
     def get_segments(self, obj):
         # using hasattr() instead because DocType.get() is overloaded and makes a request
@@ -420,6 +514,116 @@ class EdxPaginationSerializer(pagination.PageNumberPagination):
         ]))
 
 
+class EdxCursorPaginationSerializer(EdxPaginationSerializer):
+    """
+    Paginates Elasticsearch searches by page number, or by cursor when the `cursor` parameter is given
+    (empty for the first page).
+
+    A cursor holds the sort values of the last result of a page, and the next page is searched for the
+    results sorted after them, so that every page costs the same however deep it is, and the results past
+    the max result window of Elasticsearch can be reached. Elasticsearch 1.x has no `search_after`, so
+    this is done with filters on the sort fields, the last of which must be unique (e.g. the username).
+    Cursors only page forward.
+    """
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    use_cursor = False
+    next_cursor = None
+    request = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        sort_keys = self.get_sort_keys(queryset)
+        sort_values = self.decode_cursor(request.query_params[self.cursor_query_param], len(sort_keys))
+        if sort_values is not None:
+            queryset = self.search_after(queryset, sort_keys, sort_values)
+            if queryset is None:
+                return []
+
+        # One more result than the page is read, to know whether there is a next page.
+        results = list(queryset[:page_size + 1].execute())
+        page = results[:page_size]
+        if len(results) > page_size:
+            self.next_cursor = self.encode_cursor([getattr(page[-1], field, None) for field, _, _ in sort_keys])
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+
+        return Response(OrderedDict([
+            ('next', self.get_next_cursor_link()),
+            ('previous', None),
+            ('results', data)
+        ]))
+
+    def get_next_cursor_link(self):
+        if self.next_cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    @staticmethod
+    def encode_cursor(sort_values):
+        return base64.urlsafe_b64encode(json.dumps(sort_values).encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor, length):
+        """ Returns the sort values held by the cursor, or None for the first page. """
+        if not cursor:
+            return None
+        try:
+            sort_values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(sort_values, list) or len(sort_values) != length:
+            raise NotFound(self.invalid_cursor_message)
+        return sort_values
+
+    @staticmethod
+    def get_sort_keys(search):
+        """ Returns the (field, order, missing) of each of the sorts of the search, as built by `Search.sort`. """
+        sort_keys = []
+        for sort in search.to_dict().get('sort', []):
+            field, options = next(iter(sort.items()))
+            sort_keys.append((field, options.get('order', 'asc'), options.get('missing', '_last')))
+        return sort_keys
+
+    @staticmethod
+    def search_after(search, sort_keys, sort_values):
+        """
+        Filters the search to the results sorted after the given sort values, or returns None if there
+        cannot be any.
+
+        A result is sorted after the values if, for some sort, it is equal to them on all the previous
+        sorts and sorted after the value of that sort, missing values being sorted first or last.
+        """
+        def equal(field, value):
+            return F('missing', field=field) if value is None else F('term', **{field: value})
+
+        def sorted_after(field, order, missing, value):
+            if value is None:
+                return None if missing == '_last' else F('exists', field=field)
+            after = F('range', **{field: {'gt' if order == 'asc' else 'lt': value}})
+            return F('bool', should=[after, F('missing', field=field)]) if missing == '_last' else after
+
+        clauses = []
+        for index, ((field, order, missing), value) in enumerate(zip(sort_keys, sort_values)):
+            after = sorted_after(field, order, missing, value)
+            if after is not None:
+                clauses.append(F('bool', must=[
+                    equal(previous_field, previous_value)
+                    for (previous_field, _, _), previous_value in zip(sort_keys[:index], sort_values[:index])
+                ] + [after]))
+        if not clauses:
+            return None
+        return search.filter(F('bool', should=clauses))
+
+
 # pylint: disable=abstract-method
 class EngagementDaySerializer(serializers.Serializer):
     date = serializers.DateField(format=settings.DATE_FORMAT)
@@ -505,9 +709,13 @@ class CourseLearnerMetadataSerializer(serializers.Serializer):
     engagement_ranges = serializers.SerializerMethodField()
 
     def get_engagement_ranges(self, obj):
-        query_set = obj['engagement_ranges']
+        # The ranges are read in a single query, then looked up by metric and range type
+        metric_ranges = list(obj['engagement_ranges'])
+        metric_ranges_by_type = {}
+        for metric_range in metric_ranges:
+            metric_ranges_by_type.setdefault((metric_range.metric, metric_range.range_type), metric_range)
         engagement_ranges = {
-            'date_range': DateRangeSerializer(query_set[0] if len(query_set) > 0 else None).data
+            'date_range': DateRangeSerializer(metric_ranges[0] if metric_ranges else None).data
         }
 
         for metric in engagement_events.EVENTS:
@@ -521,8 +729,7 @@ class CourseLearnerMetadataSerializer(serializers.Serializer):
             # put together data to be serialized
             serializer_kwargs = {}
             for range_type, class_rank_type in ranges_ranks:
-                range_queryset = query_set.filter(metric=metric, range_type=range_type)
-                serializer_kwargs[class_rank_type] = range_queryset[0] if len(range_queryset) > 0 else None
+                serializer_kwargs[class_rank_type] = metric_ranges_by_type.get((metric, range_type))
             engagement_ranges.update({
                 metric: EnagementRangeMetricSerializer(serializer_kwargs).data
             })
@@ -530,42 +737,17 @@ class CourseLearnerMetadataSerializer(serializers.Serializer):
         return engagement_ranges
 
 
-class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(DynamicFieldsSerializerMixin, serializers.ModelSerializer):
     """
     A ModelSerializer that takes additional `fields` and/or `exclude` keyword arguments that control which
     fields should be displayed.
-
-    Blatantly taken from http://www.django-rest-framework.org/api-guide/serializers/#dynamically-modifying-fields
-
-    If a field name is specified in both `fields` and `exclude`, then the exclude option takes precedence and the field
-    will not be included in the serialized result.
-
-    Keyword Arguments:
-        fields  -- list of field names on the model to include in the serialized result
-        exclude -- list of field names on the model to exclude in the serialized result
     """
 
-    def __init__(self, *args, **kwargs):
-        # Don't pass the 'fields' arg up to the superclass
-        fields = kwargs.pop('fields', None)
-        exclude = kwargs.pop('exclude', None)
-
-        # Instantiate the superclass normally
-        super().__init__(*args, **kwargs)
-
-        if fields is not None:
-            # Drop any fields that are not specified in the `fields` argument.
-            allowed = set(fields)
-            existing = set(self.fields.keys())
-            for field_name in existing - allowed:
-                self.fields.pop(field_name)
 
-        if exclude is not None:
-            # Drop any fields that are specified in the `exclude` argument.
-            disallowed = set(exclude)
-            existing = set(self.fields.keys())
-            for field_name in existing & disallowed:  # intersection
-                self.fields.pop(field_name)
+class CourseActivitiesSerializer(CourseActivityWeeklySerializer, DynamicFieldsModelSerializer):
+    """
+    Serializer for the weekly activity of many courses.
+    """
 
 
 class CourseMetaSummaryEnrollmentSerializer(ModelSerializerWithCreatedField, DynamicFieldsModelSerializer):
@@ -0,0 +1,33 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from analytics_data_api.v0 import schema
+
+
+class SchemaTests(TestCase):
+    def setUp(self):
+        super().setUp()
+        schema.clear_schema_cache()
+        self.addCleanup(schema.clear_schema_cache)
+
+    def assertIntrospected(self, introspected):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIn('last_response_count', schema.get_table_columns('answer_distribution'))
+        self.assertEqual(bool(queries), introspected)
+
+    def test_get_table_columns(self):
+        self.assertIntrospected(True)
+        self.assertIntrospected(False)
+
+        schema.clear_schema_cache()
+        self.assertIntrospected(True)
+
+    @override_settings(ANALYTICS_SCHEMA_CACHE_TIMEOUT=0)
+    def test_get_table_columns_timeout(self):
+        self.assertIntrospected(True)
+        self.assertIntrospected(True)
+
+    def test_has_first_last_answer_distribution(self):
+        # The test database is created from ProblemFirstLastResponseAnswerDistribution
+        self.assertTrue(schema.has_first_last_answer_distribution())
@@ -1,7 +1,9 @@
 from datetime import date
+from unittest.mock import Mock
 
 from django.test import TestCase
 from django_dynamic_fixture import G
+from rest_framework.exceptions import NotFound
 
 from analytics_data_api.v0 import models as api_models
 from analytics_data_api.v0 import serializers as api_serializers
@@ -27,3 +29,106 @@ class DynamicFieldsModelSerializerTests(TestCase):
         instance = G(api_models.CourseEnrollmentDaily, course_id='3', count=1, date=now)
         serialized = TestSerializer(instance, exclude=('course_id',))
         self.assertListEqual(list(serialized.data.keys()), ['date', 'count', 'created'])
+
+
+class EdxCursorPaginationSerializerTests(TestCase):
+    sort_keys = [('problems_attempted', 'desc', '_first'), ('username', 'asc', '_last')]
+
+    def test_get_sort_keys(self):
+        search = api_models.RosterEntry.get_users_in_course(
+            'edX/DemoX/Demo_Course', sort_policies=[{'order_by': 'problems_attempted', 'sort_order': 'desc'}])
+        self.assertListEqual(api_serializers.EdxCursorPaginationSerializer.get_sort_keys(search), self.sort_keys)
+
+    def test_search_after(self):
+        search = api_models.RosterEntry.search()
+        paginator = api_serializers.EdxCursorPaginationSerializer
+        self.assertDictEqual(paginator.search_after(search, self.sort_keys, [3, 'user']).to_dict()['query'], {
+            'filtered': {
+                'query': {'match_all': {}},
+                'filter': {'bool': {'should': [
+                    {'bool': {'must': [{'range': {'problems_attempted': {'lt': 3}}}]}},
+                    {'bool': {'must': [
+                        {'term': {'problems_attempted': 3}},
+                        {'bool': {'should': [
+                            {'range': {'username': {'gt': 'user'}}},
+                            {'missing': {'field': 'username'}},
+                        ]}},
+                    ]}},
+                ]}},
+            }
+        })
+        self.assertDictEqual(paginator.search_after(search, self.sort_keys, [None, 'user']).to_dict()['query'], {
+            'filtered': {
+                'query': {'match_all': {}},
+                'filter': {'bool': {'should': [
+                    {'bool': {'must': [{'exists': {'field': 'problems_attempted'}}]}},
+                    {'bool': {'must': [
+                        {'missing': {'field': 'problems_attempted'}},
+                        {'bool': {'should': [
+                            {'range': {'username': {'gt': 'user'}}},
+                            {'missing': {'field': 'username'}},
+                        ]}},
+                    ]}},
+                ]}},
+            }
+        })
+        self.assertIsNone(paginator.search_after(search, [('username', 'asc', '_last')], [None]))
+
+    def test_cursor(self):
+        paginator = api_serializers.EdxCursorPaginationSerializer()
+        cursor = paginator.encode_cursor([1.5, None, 'user'])
+        self.assertListEqual(paginator.decode_cursor(cursor, 3), [1.5, None, 'user'])
+        self.assertIsNone(paginator.decode_cursor('', 3))
+        for cursor in (cursor[:-2], 'not a cursor', paginator.encode_cursor([1, 'user']), paginator.encode_cursor({})):
+            with self.assertRaises(NotFound):
+                paginator.decode_cursor(cursor, 3)
+
+
+class LearnerSerializerTests(TestCase):
+    def test_get_source_fields(self):
+        serializer = api_serializers.LearnerSerializer
+        self.assertListEqual(serializer.get_source_fields(['username', 'account_url', 'last_updated']), ['username'])
+        self.assertListEqual(serializer.get_source_fields(['engagements', 'unknown']), [
+            'discussion_contributions', 'problem_attempts_per_completed', 'problems_attempted',
+            'problems_completed', 'videos_viewed',
+        ])
+        self.assertNotIn('goals', serializer.get_source_fields(exclude=['goals', 'mailing_address']))
+        self.assertIn('mailing_address', serializer.get_source_fields(exclude=['goals']))
+
+    def test_search_source(self):
+        search = api_models.RosterEntry.get_users_in_course(
+            'edX/DemoX/Demo_Course', sort_policies=[{'order_by': 'problems_attempted', 'sort_order': 'desc'}],
+            source_fields=['name'])
+        self.assertDictEqual(search.to_dict()['_source'], {'include': ['name', 'problems_attempted', 'username']})
+        search = api_models.RosterEntry.get_users_in_course('edX/DemoX/Demo_Course')
+        self.assertNotIn('_source', search.to_dict())
+
+    def test_fields(self):
+        learner = Mock(username='user', email='user@example.com')
+        serialized = api_serializers.LearnerSerializer(learner, fields=['email', 'username', 'last_updated'],
+                                                       exclude=['last_updated']).data
+        self.assertDictEqual(serialized, {'username': 'user', 'email': 'user@example.com'})
+
+
+class CourseLearnerMetadataSerializerTests(TestCase):
+    def test_engagement_ranges(self):
+        for metric in ('problems_attempted', 'problem_attempts_per_completed'):
+            for range_type, low_value in (('low', 0), ('normal', 10), ('high', 20)):
+                G(api_models.ModuleEngagementMetricRanges, course_id='edX/DemoX/Demo_Course', metric=metric,
+                  range_type=range_type, low_value=low_value, high_value=low_value + 10,
+                  start_date=date(2015, 7, 1), end_date=date(2015, 7, 21))
+
+        queryset = api_models.ModuleEngagementMetricRanges.objects.filter(course_id='edX/DemoX/Demo_Course')
+        with self.assertNumQueries(1):
+            engagement_ranges = api_serializers.CourseLearnerMetadataSerializer(
+                {'es_data': {}, 'engagement_ranges': queryset}).data['engagement_ranges']
+        self.assertDictEqual(engagement_ranges['date_range'], {'start': '2015-07-01', 'end': '2015-07-21'})
+        self.assertDictEqual(engagement_ranges['problems_attempted'], {
+            'class_rank_bottom': [0.0, 10.0], 'class_rank_average': [10.0, 20.0], 'class_rank_top': [20.0, 30.0],
+        })
+        self.assertDictEqual(engagement_ranges['problem_attempts_per_completed'], {
+            'class_rank_bottom': [20.0, 30.0], 'class_rank_average': [10.0, 20.0], 'class_rank_top': [0.0, 10.0],
+        })
+        self.assertDictEqual(engagement_ranges['problems_completed'], {
+            'class_rank_bottom': None, 'class_rank_average': None, 'class_rank_top': None,
+        })
@@ -3,11 +3,35 @@ import datetime
 
 import enterprise_data
 import pytz
+from django.conf import settings
+from django.db import connections
 from django_dynamic_fixture import G
 
 from analytics_data_api.v0 import models
 
 
+class UnmanagedTablesMixin:
+    """
+    Creates the tables of `unmanaged_models`, which migrate --run-syncdb leaves out of the test
+    database, for the tests of a class. Must precede the TestCase in the bases.
+    """
+    unmanaged_models = ()
+
+    @classmethod
+    def setUpClass(cls):
+        with connections[settings.ANALYTICS_DATABASE].schema_editor() as schema_editor:
+            for model in cls.unmanaged_models:
+                schema_editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connections[settings.ANALYTICS_DATABASE].schema_editor() as schema_editor:
+            for model in cls.unmanaged_models:
+                schema_editor.delete_model(model)
+
+
 def flatten(dictionary, parent_key='', sep='.'):
     """
     Flatten dictionary
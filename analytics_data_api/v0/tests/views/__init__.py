@@ -3,6 +3,9 @@ import json
 from collections import OrderedDict
 
 import six
+from django.conf import settings
+from django.core.cache import caches
+from django.test.utils import override_settings
 from django_dynamic_fixture import G
 from rest_framework import status
 from six.moves.urllib.parse import urlencode  # pylint: disable=import-error
@@ -174,6 +177,62 @@ class APIListViewTestMixin:
 
         self.assertCountEqual(response.data, expected_results)
 
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_response_cache_post(self):
+        if not self.test_post_method:
+            return
+        caches[settings.RESPONSE_CACHE_ALIAS].clear()
+        self.generate_data()
+        # Each POST selects its items in the body, so it must not be served another POST's cached items
+        for item_id in self.default_ids[:2]:
+            response = self.authenticated_post(self.path(), data={self.ids_param: [item_id]})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([item[self.model_id] for item in response.data], [item_id])
+
+    @override_settings(BULK_ID_LOOKUP_BATCH_SIZE=2)
+    def test_batched_ids(self):
+        ids = self.default_ids + ['no/items/found']
+        self.generate_data()
+        response = self.validated_request(ids=ids, exclude=self.always_exclude)
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(response.data, self.all_expected_results())
+
+    def _test_streamed_all_items(self, accept):
+        self.generate_data()
+        path = self.path({'exclude': self.always_exclude})
+        expected = self.authenticated_get(path, HTTP_ACCEPT=accept)
+        with override_settings(STREAM_UNFILTERED_LIST_RESPONSES=True):
+            response = self.authenticated_get(path, HTTP_ACCEPT=accept)
+            content = b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], expected['Content-Type'])
+        return content, expected.content
+
+    def test_streamed_json(self):
+        content, expected_content = self._test_streamed_all_items('application/json')
+        self.assertEqual(json.loads(content.decode('utf-8')), json.loads(expected_content.decode('utf-8')))
+
+    def test_streamed_csv(self):
+        content, expected_content = self._test_streamed_all_items('text/csv')
+        self.assertEqual(content, expected_content)
+
+    @override_settings(STREAM_UNFILTERED_LIST_RESPONSES=True)
+    def test_streamed_no_items(self):
+        response = self.validated_request()
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(CONDITIONAL_RESPONSES_ENABLED=True)
+    def test_conditional_get(self):
+        self.generate_data()
+        response = self.validated_request(ids=self.default_ids[:1])
+        self.assertEqual(response.status_code, 200)
+
+        path = self.path({self.ids_param: self.default_ids[:1]})
+        response = self.authenticated_get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = self.authenticated_get(path, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
     def test_no_items(self):
         response = self.validated_request()
         self.assertEqual(response.status_code, 404)
@@ -0,0 +1,113 @@
+import datetime
+from collections import OrderedDict
+
+import ddt
+import pytz
+from django.conf import settings
+from django.core.cache import caches
+from django.test.utils import override_settings
+from django_dynamic_fixture import G
+
+from analytics_data_api.v0 import models, serializers
+from analytics_data_api.v0.tests.views import APIListViewTestMixin, CourseSamples
+from analyticsdataserver.tests import TestCaseWithAuthentication
+
+
+@ddt.ddt
+class CourseActivitiesViewTests(TestCaseWithAuthentication, APIListViewTestMixin):
+    model = models.CourseActivityWeekly
+    model_id = 'course_id'
+    ids_param = 'course_ids'
+    serializer = serializers.CourseActivitiesSerializer
+    list_name = 'course_activities'
+    default_ids = CourseSamples.course_ids
+    test_post_method = True
+    activity_counts = OrderedDict([
+        ('ACTIVE', ('any', 300)),
+        ('ATTEMPTED_PROBLEM', ('attempted_problem', 200)),
+        ('PLAYED_VIDEO', ('played_video', 400)),
+        ('POSTED_FORUM', ('posted_forum', 100)),
+    ])
+
+    def setUp(self):
+        super().setUp()
+        self.interval_start = datetime.datetime(2014, 1, 1, tzinfo=pytz.utc)
+        self.maxDiff = None
+
+    def get_interval(self, weeks_ago=0):
+        interval_start = self.interval_start - datetime.timedelta(weeks=weeks_ago)
+        return interval_start, interval_start + datetime.timedelta(weeks=1)
+
+    def create_model(self, model_id, **kwargs):
+        for weeks_ago in (1, 0):
+            interval_start, interval_end = self.get_interval(weeks_ago)
+            for activity_type, (_, count) in self.activity_counts.items():
+                G(self.model, course_id=model_id, interval_start=interval_start, interval_end=interval_end,
+                  activity_type=activity_type, count=count + weeks_ago)
+
+    def expected_result(self, item_id, weeks_ago=0):  # pylint: disable=arguments-differ
+        interval_start, interval_end = self.get_interval(weeks_ago)
+        result = OrderedDict([
+            ('interval_start', interval_start.strftime(settings.DATETIME_FORMAT)),
+            ('interval_end', interval_end.strftime(settings.DATETIME_FORMAT)),
+            ('course_id', item_id),
+        ])
+        result.update((activity, count + weeks_ago) for activity, count in self.activity_counts.values())
+        return result
+
+    @ddt.data(
+        None,
+        CourseSamples.course_ids,
+        ['not/real/course'].extend(CourseSamples.course_ids),
+    )
+    def test_all_courses(self, course_ids):
+        self._test_all_items(course_ids)
+
+    @ddt.data(*CourseSamples.course_ids)
+    def test_one_course(self, course_id):
+        self._test_one_item(course_id)
+
+    @ddt.data(
+        ['course_id'],
+        ['interval_end', 'any'],
+    )
+    def test_fields(self, fields):
+        self._test_fields(fields)
+
+    def test_date_window(self):
+        self.generate_data()
+        interval_start, _ = self.get_interval(weeks_ago=1)
+        response = self.validated_request(ids=self.default_ids[:2], exclude=self.always_exclude,
+                                          start_date=interval_start.strftime(settings.DATE_FORMAT))
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(response.data, [
+            self.expected_result(course_id, weeks_ago)
+            for course_id in sorted(self.default_ids[:2]) for weeks_ago in (1, 0)
+        ])
+
+        _, interval_end = self.get_interval(weeks_ago=0)
+        response = self.validated_request(ids=self.default_ids[:2], exclude=self.always_exclude,
+                                          end_date=interval_end.strftime(settings.DATE_FORMAT))
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(response.data, [
+            self.expected_result(course_id, weeks_ago=1) for course_id in sorted(self.default_ids[:2])
+        ])
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_response_cache_post_date_window(self):
+        caches[settings.RESPONSE_CACHE_ALIAS].clear()
+        self.generate_data()
+        interval_start, _ = self.get_interval(weeks_ago=1)
+        _, interval_end = self.get_interval(weeks_ago=0)
+        course_id = self.default_ids[0]
+        # The dates of each POST are in its body, so they must select its cached rows
+        for dates, weeks_ago in (({'start_date': interval_start.strftime(settings.DATE_FORMAT)}, (1, 0)),
+                                 ({'end_date': interval_end.strftime(settings.DATE_FORMAT)}, (1,))):
+            response = self.authenticated_post(self.path(), data=dict(dates, course_ids=[course_id],
+                                                                      exclude=self.always_exclude))
+            self.assertEqual(response.status_code, 200)
+            self.assertListEqual(response.data, [self.expected_result(course_id, weeks) for weeks in weeks_ago])
+
+    def test_bad_course_id(self):
+        response = self.validated_request(ids=['malformed-course-id'])
+        self.assertEqual(response.status_code, 400)
@@ -1,14 +1,20 @@
 import datetime
+import json
 
 import ddt
 import pytz
 from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.utils import timezone
 from django_dynamic_fixture import G
 
 from analytics_data_api.constants import enrollment_modes
 from analytics_data_api.v0 import models, serializers
 from analytics_data_api.v0.tests.views import APIListViewTestMixin, CourseSamples, VerifyCourseIdMixin
+from analytics_data_api.v0.views.course_summaries import CourseSummariesView
 from analyticsdataserver.tests import TestCaseWithAuthentication
 
 
@@ -26,6 +32,7 @@ class CourseSummariesViewTests(VerifyCourseIdMixin, TestCaseWithAuthentication,
 
     def setUp(self):
         super().setUp()
+        cache.clear()
         self.now = timezone.now()
         self.maxDiff = None
 
@@ -240,3 +247,120 @@ class CourseSummariesViewTests(VerifyCourseIdMixin, TestCaseWithAuthentication,
         responseBeforeDate = self.validated_request(exclude=self.always_exclude, recent_date=before)
         self.assertEqual(responseBeforeDate.status_code, 200)
         self.assertCountEqual(responseBeforeDate.data, expectedBeforeDate)
+
+    def test_recent_count_change_latest_dates(self):
+        'Tests that each course is compared with its own latest daily count on-or-before recent_date'
+        recent = datetime.date.today() - datetime.timedelta(5)
+        self.generate_data()
+        first_course, second_course = CourseSamples.course_ids[:2]
+        for course_id, days_before, count in ((first_course, 2, 10), (second_course, 1, 20), (second_course, 2, 30)):
+            G(models.CourseEnrollmentDaily, course_id=course_id, date=recent - datetime.timedelta(days_before),
+              count=count)
+        G(models.CourseEnrollmentDaily, course_id=first_course, date=recent + datetime.timedelta(1), count=40)
+
+        response = self.validated_request(exclude=self.always_exclude, recent_date=recent.strftime('%Y-%m-%d'))
+        self.assertEqual(response.status_code, 200)
+        count = 5 * len(enrollment_modes.ALL)
+        recent_count_changes = {summary['course_id']: summary['recent_count_change'] for summary in response.data}
+        self.assertEqual(recent_count_changes[first_course], count - 10)
+        self.assertEqual(recent_count_changes[second_course], count - 20)
+
+    @override_settings(COURSE_SUMMARIES_SNAPSHOT_ENABLED=True)
+    def test_enrichment_query_count(self):
+        'Tests that programs and recent_count_change take a constant number of queries regardless of course count'
+        recent = datetime.datetime.today() - datetime.timedelta(5)
+        self.generate_data(programs=True, recent_date=recent)
+        # prime the course summaries snapshot
+        self.validated_request()
+
+        query_counts = []
+        for course_ids in (CourseSamples.course_ids[:1], CourseSamples.course_ids):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.validated_request(
+                    ids=course_ids, exclude=self.always_exclude[:1], programs=['True'],
+                    recent_date=recent.strftime('%Y-%m-%d'),
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), len(course_ids))
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    @ddt.data(True, False)
+    def test_snapshot(self, snapshot_enabled):
+        'Tests that summaries are identical with and without the snapshot, and that new loads are picked up'
+        with override_settings(COURSE_SUMMARIES_SNAPSHOT_ENABLED=snapshot_enabled):
+            self.generate_data()
+            response = self.validated_request(exclude=self.always_exclude)
+            self.assertEqual(response.status_code, 200)
+            self.assertCountEqual(response.data, self.all_expected_results())
+
+            self.now += datetime.timedelta(hours=1)
+            self.generate_data(ids=['foo/bar/baz'], availability='Upcoming')
+            response = self.validated_request(ids=['foo/bar/baz'], exclude=self.always_exclude)
+            self.assertEqual(response.status_code, 200)
+            self.assertCountEqual(response.data, self.all_expected_results(ids=['foo/bar/baz'],
+                                                                           availability='Upcoming'))
+
+    @override_settings(COURSE_SUMMARIES_SNAPSHOT_ENABLED=True, CONDITIONAL_RESPONSES_ENABLED=True,
+                       LAST_MODIFIED_CACHE_TIMEOUT=60)
+    def test_snapshot_version(self):
+        'Tests that the snapshot and its validators follow the cached load time, and that warming picks up new loads'
+        self.generate_data()
+        response = self.validated_request(exclude=self.always_exclude)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.now += datetime.timedelta(hours=1)
+        self.generate_data(ids=['foo/bar/baz'], availability='Upcoming')
+        response = self.validated_request(ids=['foo/bar/baz'], exclude=self.always_exclude)
+        self.assertEqual(response.status_code, 404)
+
+        call_command('warm_course_summaries')
+        response = self.validated_request(exclude=self.always_exclude)
+        self.assertEqual(len(response.data), len(CourseSamples.course_ids) + 1)
+        self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+
+        # A snapshot rebuilt from a load after the cached load time is validated by the load that was read.
+        version = CourseSummariesView().get_snapshot_version()
+        self.now += datetime.timedelta(hours=1)
+        self.generate_data(ids=['foo/bar/qux'])
+        cache.delete(CourseSummariesView.get_snapshot_key(version))
+        response = self.validated_request(exclude=self.always_exclude)
+        self.assertEqual(len(response.data), len(CourseSamples.course_ids) + 2)
+        self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+        response = self.validated_request(exclude=self.always_exclude)
+        self.assertEqual(len(response.data), len(CourseSamples.course_ids) + 2)
+        self.assertEqual(response['ETag'], etag)
+
+    @ddt.data(True, False)
+    def test_streamed_enrichments(self, snapshot_enabled):
+        'Tests that streamed summaries are enriched one batch of courses at a time'
+        recent = datetime.datetime.today() - datetime.timedelta(5)
+        self.generate_data(programs=True, recent_date=recent)
+        path = self.path({'exclude': self.always_exclude[:1], 'programs': 'True',
+                          'recent_date': recent.strftime('%Y-%m-%d')})
+        expected = self.authenticated_get(path)
+        with override_settings(STREAM_UNFILTERED_LIST_RESPONSES=True, BULK_ID_LOOKUP_BATCH_SIZE=2,
+                               COURSE_SUMMARIES_SNAPSHOT_ENABLED=snapshot_enabled):
+            response = self.authenticated_get(path)
+            content = b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(json.loads(content.decode('utf-8')), json.loads(expected.content.decode('utf-8')))
+
+    @override_settings(COURSE_SUMMARIES_SNAPSHOT_ENABLED=False)
+    def test_aggregate_in_database(self):
+        'Tests that summaries aggregated by the database are identical to those aggregated in Python'
+        self.generate_data(modes=enrollment_modes.ALL)
+        self.generate_data(ids=['foo/bar/baz'], modes=[enrollment_modes.AUDIT, enrollment_modes.PROFESSIONAL_NO_ID],
+                           availability='Starting Soon')
+        expected = self.validated_request()
+        self.assertEqual(expected.status_code, 200)
+        for ids in (None, ['foo/bar/baz', CourseSamples.course_ids[0]]):
+            with override_settings(COURSE_SUMMARIES_AGGREGATE_IN_DATABASE=True):
+                response = self.validated_request(ids=ids)
+            self.assertEqual(response.status_code, 200)
+            expected_data = [summary for summary in expected.data if not ids or summary['course_id'] in ids]
+            self.assertEqual(response.data, expected_data)
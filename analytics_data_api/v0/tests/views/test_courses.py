@@ -11,6 +11,10 @@ import ddt
 import pytz
 import six
 from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.utils import timezone
 from django_dynamic_fixture import G
 from opaque_keys.edx.keys import CourseKey
@@ -27,9 +31,11 @@ from analytics_data_api.constants.engagement_events import (
     VIEWED,
 )
 from analytics_data_api.utils import get_filename_safe_course_id
-from analytics_data_api.v0 import models
-from analytics_data_api.v0.tests.utils import create_engagement
+from analytics_data_api.v0 import models, serializers
+from analytics_data_api.v0.tests.utils import UnmanagedTablesMixin, create_engagement
 from analytics_data_api.v0.tests.views import CourseSamples, VerifyCsvResponseMixin
+from analytics_data_api.v0.views.courses import BaseCourseView, get_latest_activity_interval_ends
+from analytics_data_api.v0.views.utils import clear_max_created
 from analyticsdataserver.tests import TestCaseWithAuthentication
 
 
@@ -124,6 +130,41 @@ class CourseViewTestCaseMixin(VerifyCsvResponseMixin):
         """ Verify the endpoint returns multiple data points when supplied with an interval of dates. """
         raise NotImplementedError
 
+    @ddt.data(*CourseSamples.course_ids)
+    @override_settings(CONDITIONAL_RESPONSES_ENABLED=True)
+    def test_conditional_get(self, course_id):
+        """ Verify the endpoint returns a 304 if the client's copy of the data is current. """
+        self.generate_data(course_id)
+        path = f'{self.api_root_path}courses/{course_id}{self.path}'
+        response = self.authenticated_get(path)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        response = self.authenticated_get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        response = self.authenticated_get(path, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        # The CSV representation has its own ETag
+        response = self.authenticated_get(path, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @ddt.data(*CourseSamples.course_ids)
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_response_cache(self, course_id):
+        """ Verify the endpoint caches the response data until new data is loaded. """
+        caches[settings.RESPONSE_CACHE_ALIAS].clear()
+        self.generate_data(course_id)
+        expected = self.format_as_response(*self.get_latest_data(course_id))
+        for _ in range(2):
+            self.assertViewReturnsExpectedData(expected, course_id)
+
+        view_stats = list(BaseCourseView.get_response_cache_stats().values())
+        self.assertEqual(view_stats, [{'hits': 1, 'misses': 1}])
+
     def assertIntervalFilteringWorks(self, expected_response, course_id, start_date, end_date):
         # If start date is after date of existing data, return a 404
         date = (start_date + datetime.timedelta(days=30)).strftime(settings.DATETIME_FORMAT)
@@ -173,6 +214,39 @@ class CourseEnrollmentViewTestCaseMixin(CourseViewTestCaseMixin):
         expected = self.format_as_response(*self.model.objects.filter(date=self.date))
         self.assertIntervalFilteringWorks(expected, course_id, self.date, self.date + datetime.timedelta(days=1))
 
+    @ddt.data('week', 'month')
+    def test_get_with_interval_rollup(self, interval):
+        """ Verify the endpoint returns the counts of the last date in each interval. """
+        course_id = CourseSamples.course_ids[0]
+        self.generate_data(course_id)
+        path = '{}courses/{}{}?start_date={}&end_date={}'.format(
+            self.api_root_path, course_id, self.path,
+            (self.date - datetime.timedelta(days=30)).strftime(settings.DATE_FORMAT),
+            (self.date + datetime.timedelta(days=1)).strftime(settings.DATE_FORMAT))
+        daily_response = self.authenticated_get(path)
+        self.assertEqual(daily_response.status_code, 200)
+
+        last_dates = {}
+        for date in sorted({item['date'] for item in daily_response.data}):
+            date = datetime.datetime.strptime(date, settings.DATE_FORMAT).date()
+            if interval == 'week':
+                interval_start = date - datetime.timedelta(days=date.weekday())
+            else:
+                interval_start = date.replace(day=1)
+            last_dates[interval_start] = date.strftime(settings.DATE_FORMAT)
+        expected = [item for item in daily_response.data if item['date'] in last_dates.values()]
+
+        response = self.authenticated_get(f'{path}&interval={interval}')
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(response.data, expected)
+
+    def test_get_with_invalid_interval(self):
+        course_id = CourseSamples.course_ids[0]
+        self.generate_data(course_id)
+        response = self.authenticated_get(
+            f'{self.api_root_path}courses/{course_id}{self.path}?start_date=2013-01-01&interval=year')
+        self.assertEqual(response.status_code, 400)
+
 
 @ddt.ddt
 class CourseActivityLastWeekTest(TestCaseWithAuthentication):
@@ -270,6 +344,49 @@ class CourseActivityLastWeekTest(TestCaseWithAuthentication):
         self.assertEqual(response.data, self.get_activity_record(course_id=course_id, activity_type=activity_type,
                                                                  count=400))
 
+    @ddt.data(*CourseSamples.course_ids)
+    def test_most_recent_week(self, course_id):
+        self.generate_data(course_id)
+        interval_start = datetime.datetime(2013, 12, 25, tzinfo=pytz.utc)
+        G(models.CourseActivityWeekly, course_id=course_id, interval_start=interval_start,
+          interval_end=interval_start + datetime.timedelta(weeks=1), activity_type='ACTIVE', count=50)
+        response = self.authenticated_get(f'/api/v0/courses/{course_id}/recent_activity')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, self.get_activity_record(course_id=course_id))
+
+    @override_settings(LAST_MODIFIED_CACHE_TIMEOUT=60)
+    def test_latest_interval_ends_cached(self):
+        cache.clear()
+        course_id = CourseSamples.course_ids[0]
+        self.generate_data(course_id)
+        expected = {activity_type: datetime.datetime(2014, 1, 8, tzinfo=pytz.utc)
+                    for activity_type in ('POSTED_FORUM', 'ATTEMPTED_PROBLEM', 'ACTIVE', 'PLAYED_VIDEO')}
+        self.assertDictEqual(get_latest_activity_interval_ends(course_id), expected)
+
+        models.CourseActivityWeekly.objects.filter(activity_type='ACTIVE').delete()
+        with self.assertNumQueries(0):
+            self.assertDictEqual(get_latest_activity_interval_ends(course_id), expected)
+
+        # Once the time the activity was last loaded expires, the interval ends of the new load are computed.
+        del expected['ACTIVE']
+        models.CourseActivityWeekly.objects.update(created=timezone.now() + datetime.timedelta(seconds=1))
+        clear_max_created(models.CourseActivityWeekly.objects.filter(course_id=course_id))
+        self.assertDictEqual(get_latest_activity_interval_ends(course_id), expected)
+        self.assertDictEqual(get_latest_activity_interval_ends('foo'), {})
+
+    @override_settings(LAST_MODIFIED_CACHE_TIMEOUT=60)
+    def test_activity_query_count(self):
+        cache.clear()
+        course_id = CourseSamples.course_ids[0]
+        self.generate_data(course_id)
+        self.assertValidActivityResponse(course_id, 'ANY', 300)
+
+        # Only the activity itself is queried, not the time it was last loaded nor its latest intervals.
+        with CaptureQueriesContext(connection) as queries:
+            self.assertValidActivityResponse(course_id, 'ANY', 300)
+        activity_queries = [query for query in queries if 'course_activity' in query['sql']]
+        self.assertEqual(len(activity_queries), 1)
+
 
 @ddt.ddt
 class CourseEnrollmentByBirthYearViewTests(CourseEnrollmentViewTestCaseMixin, TestCaseWithAuthentication):
@@ -405,6 +522,21 @@ class CourseEnrollmentViewTests(CourseEnrollmentViewTestCaseMixin, TestCaseWithA
             for ce in args
         ]
 
+    def test_get_monthly_and_weekly(self):
+        course_id = CourseSamples.course_ids[0]
+        for day, count in ((1, 203), (2, 210), (20, 250)):
+            G(self.model, course_id=course_id, date=datetime.date(2014, 1, day), count=count)
+
+        path = f'{self.api_root_path}courses/{course_id}{self.path}?start_date=2014-01-01&end_date=2014-02-01'
+        response = self.authenticated_get(f'{path}&interval=month')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(item['date'], item['count']) for item in response.data], [('2014-01-20', 250)])
+
+        response = self.authenticated_get(f'{path}&interval=week')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(item['date'], item['count']) for item in response.data],
+                         [('2014-01-02', 210), ('2014-01-20', 250)])
+
 
 @ddt.ddt
 class CourseEnrollmentModeViewTests(CourseEnrollmentViewTestCaseMixin, DefaultFillTestMixin,
@@ -512,6 +644,95 @@ class CourseEnrollmentByLocationViewTests(CourseEnrollmentViewTestCaseMixin, Tes
         super().setUpClass()
         cls.country = get_country('US')
 
+    def test_get_country_aliases(self):
+        """ Verify counts stored under different codes of the same country are summed. """
+        course_id = CourseSamples.course_ids[0]
+        G(self.model, course_id=course_id, country_code='US', count=2, date=self.date)
+        G(self.model, course_id=course_id, country_code='USA', count=3, date=self.date)
+        G(self.model, course_id=course_id, country_code='840', count=5, date=self.date)
+        G(self.model, course_id=course_id, country_code='A1', count=7, date=self.date)
+        G(self.model, course_id=course_id, country_code='O1', count=11, date=self.date)
+
+        response = self.authenticated_get(f'{self.api_root_path}courses/{course_id}{self.path}')
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(
+            [(item['country']['alpha2'], item['count']) for item in response.data],
+            [(None, 18), ('US', 10)]
+        )
+
+
+@ddt.ddt
+class CourseEnrollmentAllViewTests(TestCaseWithAuthentication):
+    dimension_paths = OrderedDict([
+        ('enrollment', 'enrollment'),
+        ('mode', 'enrollment/mode'),
+        ('birth_year', 'enrollment/birth_year'),
+        ('education', 'enrollment/education'),
+        ('gender', 'enrollment/gender'),
+        ('location', 'enrollment/location'),
+    ])
+
+    def setUp(self):
+        super().setUp()
+        self.date = datetime.date(2014, 1, 1)
+
+    def generate_data(self, course_id):
+        for date in (self.date, self.date - datetime.timedelta(days=5)):
+            G(models.CourseEnrollmentDaily, course_id=course_id, date=date, count=203)
+            for mode in (enrollment_modes.AUDIT, enrollment_modes.VERIFIED):
+                G(models.CourseEnrollmentModeDaily, course_id=course_id, date=date, mode=mode, count=10,
+                  cumulative_count=15)
+            G(models.CourseEnrollmentByBirthYear, course_id=course_id, date=date, birth_year=1956)
+            G(models.CourseEnrollmentByEducation, course_id=course_id, date=date, education_level='bachelors')
+            G(models.CourseEnrollmentByGender, course_id=course_id, date=date, gender='f')
+            G(models.CourseEnrollmentByCountry, course_id=course_id, date=date, country_code='US')
+
+    def path(self, course_id, query_string=''):
+        return f'/api/v0/courses/{course_id}/enrollment/all/{query_string}'
+
+    def expected_data(self, course_id, dimensions, query_string=''):
+        expected = OrderedDict()
+        for dimension in dimensions:
+            response = self.authenticated_get(
+                f'/api/v0/courses/{course_id}/{self.dimension_paths[dimension]}/{query_string}')
+            expected[dimension] = response.data if response.status_code == 200 else []
+        return expected
+
+    @ddt.data(*CourseSamples.course_ids)
+    def test_get(self, course_id):
+        self.generate_data(course_id)
+        response = self.authenticated_get(self.path(course_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, self.expected_data(course_id, self.dimension_paths))
+
+    def test_get_with_dates(self):
+        course_id = CourseSamples.course_ids[0]
+        self.generate_data(course_id)
+        query_string = '?start_date=2013-12-01&end_date=2014-01-02'
+        response = self.authenticated_get(self.path(course_id, query_string))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, self.expected_data(course_id, self.dimension_paths, query_string))
+        self.assertEqual(len(response.data['enrollment']), 2)
+
+    def test_dimensions(self):
+        course_id = CourseSamples.course_ids[0]
+        self.generate_data(course_id)
+        models.CourseEnrollmentByGender.objects.all().delete()
+        response = self.authenticated_get(self.path(course_id, '?dimensions=mode,gender'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, self.expected_data(course_id, ['mode', 'gender']))
+        self.assertEqual(response.data['gender'], [])
+
+    def test_invalid_dimensions(self):
+        course_id = CourseSamples.course_ids[0]
+        self.generate_data(course_id)
+        response = self.authenticated_get(self.path(course_id, '?dimensions=mode,shoe_size'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_not_found(self):
+        response = self.authenticated_get(self.path('edX/DemoX/Non_Existent_Course'))
+        self.assertEqual(response.status_code, 404)
+
 
 @ddt.ddt
 class CourseActivityWeeklyViewTests(CourseViewTestCaseMixin, TestCaseWithAuthentication):
@@ -587,7 +808,9 @@ class CourseActivityWeeklyViewTests(CourseViewTestCaseMixin, TestCaseWithAuthent
 
 
 @ddt.ddt
-class CourseProblemsListViewTests(TestCaseWithAuthentication):
+class CourseProblemsListViewTests(UnmanagedTablesMixin, TestCaseWithAuthentication):
+    unmanaged_models = (models.ProblemSubmissionAggregate,)
+
     def _get_data(self, course_id):
         """
         Retrieve data for the specified course.
@@ -648,6 +871,33 @@ class CourseProblemsListViewTests(TestCaseWithAuthentication):
         response = self._get_data('foo/bar/course')
         self.assertEqual(response.status_code, 404)
 
+    @ddt.data(*CourseSamples.course_ids)
+    def test_aggregates_parity(self, course_id):
+        """
+        The problems read from the aggregates should match those aggregated from the answer distribution.
+        """
+        created = timezone.now().replace(microsecond=0)
+        for other_course_id in CourseSamples.course_ids:
+            for module_index, (num_parts, correct_count, incorrect_count) in enumerate([(1, 7, 3), (3, 11, 4)]):
+                for part_index in range(num_parts):
+                    for correct, count in ((True, correct_count), (False, incorrect_count)):
+                        G(models.ProblemFirstLastResponseAnswerDistribution, course_id=other_course_id,
+                          module_id=f'i4x://test/problem/{module_index}', part_id=f'part_{part_index}',
+                          correct=correct, last_response_count=count + part_index,
+                          created=created + datetime.timedelta(seconds=part_index))
+
+        expected = self._get_data(course_id)
+        self.assertEqual(expected.status_code, 200)
+
+        call_command('build_problem_submission_aggregates', batch_size=2)
+        with override_settings(PROBLEM_SUBMISSION_AGGREGATES_ENABLED=True):
+            response = self._get_data(course_id)
+            self.assertEqual(response.status_code, 200)
+            self.assertListEqual([dict(d) for d in response.data], [dict(d) for d in expected.data])
+
+            response = self._get_data('foo/bar/course')
+            self.assertEqual(response.status_code, 404)
+
 
 @ddt.ddt
 class CourseProblemsAndTagsListViewTests(TestCaseWithAuthentication):
@@ -727,6 +977,27 @@ class CourseProblemsAndTagsListViewTests(TestCaseWithAuthentication):
         response = self._get_data('foo/bar/course')
         self.assertEqual(response.status_code, 404)
 
+    def test_get_sorted_tags(self):
+        """
+        The problems and the values of each of their tags should be sorted, whatever order they were loaded in.
+        """
+        course_id = CourseSamples.course_ids[0]
+        for module_id in ('i4x://test/problem/2', 'i4x://test/problem/1'):
+            for tag_value in ('Medium', 'Hard', 'Easy'):
+                for tag_name in ('learning_outcome', 'difficulty'):
+                    G(models.ProblemsAndTags, course_id=course_id, module_id=module_id,
+                      tag_name=tag_name, tag_value=tag_value)
+
+        response = self._get_data(course_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual([problem['module_id'] for problem in response.data],
+                             ['i4x://test/problem/1', 'i4x://test/problem/2'])
+        for problem in response.data:
+            self.assertListEqual(list(problem['tags'].items()), [
+                ('difficulty', ['Easy', 'Hard', 'Medium']),
+                ('learning_outcome', ['Easy', 'Hard', 'Medium']),
+            ])
+
 
 @ddt.ddt
 class CourseVideosListViewTests(TestCaseWithAuthentication):
@@ -786,6 +1057,75 @@ class CourseVideosListViewTests(TestCaseWithAuthentication):
         self.assertEqual(response.status_code, 404)
 
 
+@ddt.ddt
+class CourseModuleDistributionViewTests(TestCaseWithAuthentication):
+    course_id = CourseSamples.course_ids[0]
+    module_ids = ['i4x://edX/DemoX/Demo_Course/problem/2', 'i4x://edX/DemoX/Demo_Course/problem/1']
+
+    def setUp(self):
+        super().setUp()
+        # a row of another course, which shouldn't be included in results
+        G(models.GradeDistribution, course_id=CourseSamples.course_ids[1], module_id=self.module_ids[0])
+        G(models.SequentialOpenDistribution, course_id=CourseSamples.course_ids[1], module_id=self.module_ids[0])
+        for module_id in self.module_ids:
+            for grade in (2, 0, 1):
+                G(models.GradeDistribution, course_id=self.course_id, module_id=module_id, grade=grade, max_grade=2)
+            G(models.SequentialOpenDistribution, course_id=self.course_id, module_id=module_id)
+
+    def _get_data(self, path, module_ids=None, **headers):
+        url = f'/api/v0/courses/{self.course_id}/{path}/'
+        if module_ids:
+            url += '?module_ids={}'.format(','.join(module_ids))
+        return self.authenticated_get(url, **headers)
+
+    def expected_results(self, model, serializer, ordering, module_ids=None):
+        queryset = model.objects.filter(course_id=self.course_id).order_by(*ordering)
+        if module_ids:
+            queryset = queryset.filter(module_id__in=module_ids)
+        return serializer(queryset, many=True).data
+
+    @ddt.data(
+        ('grade_distribution', models.GradeDistribution, serializers.GradeDistributionSerializer,
+         ('module_id', 'grade')),
+        ('sequential_open_distribution', models.SequentialOpenDistribution,
+         serializers.SequentialOpenDistributionSerializer, ('module_id',)),
+    )
+    @ddt.unpack
+    def test_get(self, path, model, serializer, ordering):
+        response = self._get_data(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(response.data, self.expected_results(model, serializer, ordering))
+        self.assertListEqual(sorted({row['module_id'] for row in response.data}), sorted(self.module_ids))
+
+        response = self._get_data(path, module_ids=self.module_ids[:1])
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(response.data, self.expected_results(model, serializer, ordering, self.module_ids[:1]))
+
+    @ddt.data('grade_distribution', 'sequential_open_distribution')
+    def test_get_streamed(self, path):
+        for accept in ('application/json', 'text/csv'):
+            expected = self._get_data(path, HTTP_ACCEPT=accept)
+            with override_settings(STREAM_UNFILTERED_LIST_RESPONSES=True):
+                response = self._get_data(path, HTTP_ACCEPT=accept)
+                content = b''.join(response.streaming_content)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], expected['Content-Type'])
+            self.assertEqual(response.get('Content-Disposition'), expected.get('Content-Disposition'))
+            self.assertEqual(content, expected.content)
+
+    @ddt.data('grade_distribution', 'sequential_open_distribution')
+    def test_get_404(self, path):
+        for streamed in (False, True):
+            for accept in ('application/json', 'text/csv'):
+                with override_settings(STREAM_UNFILTERED_LIST_RESPONSES=streamed):
+                    response = self._get_data(path, module_ids=['i4x://edX/DemoX/Demo_Course/problem/not-found'],
+                                              HTTP_ACCEPT=accept)
+                    self.assertEqual(response.status_code, 404)
+                    response = self.authenticated_get(f'/api/v0/courses/{CourseSamples.course_ids[2]}/{path}/',
+                                                      HTTP_ACCEPT=accept)
+                    self.assertEqual(response.status_code, 404)
+
+
 @ddt.ddt
 class UserEngagementViewTests(TestCaseWithAuthentication):
 
@@ -7,6 +7,7 @@ from unittest.mock import Mock, patch
 import ddt
 from django.conf import settings
 from django.core import management
+from django.core.cache import cache
 from django.test import override_settings
 from django_dynamic_fixture import G
 from elasticsearch import Elasticsearch
@@ -17,6 +18,11 @@ from analytics_data_api.constants import engagement_events
 from analytics_data_api.v0.models import ModuleEngagementMetricRanges
 from analytics_data_api.v0.tests.views import CourseSamples, VerifyCourseIdMixin, VerifyCsvResponseMixin
 from analytics_data_api.v0.views import CsvViewMixin, PaginatedHeadersMixin
+from analytics_data_api.v0.views.learners import (
+    clear_roster_last_updated_cache,
+    get_course_learner_metadata,
+    get_roster_last_updated,
+)
 from analyticsdataserver.tests import TestCaseWithAuthentication
 
 
@@ -33,6 +39,9 @@ class LearnerAPITestMixin(CsvViewMixin):
         # pylint: disable=unexpected-keyword-arg
         self._es.cluster.health(index=settings.ELASTICSEARCH_LEARNERS_INDEX, wait_for_status='yellow')
         self.addCleanup(lambda: management.call_command('delete_elasticsearch_learners_indices'))
+        # The roster marker, and the learner metadata cached under it, are the same from test to test
+        cache.clear()
+        clear_roster_last_updated_cache()
 
     def _create_learner(
             self,
@@ -125,6 +134,7 @@ class LearnerAPITestMixin(CsvViewMixin):
             }
         )
         self._es.indices.refresh(index=settings.ELASTICSEARCH_LEARNERS_UPDATE_INDEX)
+        clear_roster_last_updated_cache()
 
     def expected_page_url(self, course_id, page, page_size):
         """
@@ -141,6 +151,62 @@ class LearnerAPITestMixin(CsvViewMixin):
         )
 
 
+class RosterLastUpdatedTests(TestCaseWithAuthentication):
+    """Tests for the caching of the RosterUpdate marker."""
+    def setUp(self):
+        super().setUp()
+        clear_roster_last_updated_cache()
+        self.addCleanup(clear_roster_last_updated_cache)
+
+    @patch('analytics_data_api.v0.models.RosterUpdate.get_last_updated')
+    def test_cached(self, get_last_updated):
+        get_last_updated.return_value = [Mock(date=datetime.date(2015, 9, 28))]
+        for _ in range(3):
+            self.assertEqual(get_roster_last_updated(), datetime.date(2015, 9, 28))
+        self.assertEqual(get_last_updated.call_count, 1)
+
+        # The marker is shared with the other processes through the ROSTER_LAST_UPDATED_CACHE_ALIAS cache
+        get_last_updated.return_value = []
+        clear_roster_last_updated_cache()
+        self.assertIsNone(get_roster_last_updated())
+        self.assertEqual(get_last_updated.call_count, 2)
+        with patch('analytics_data_api.v0.views.learners._roster_last_updated', {}):
+            self.assertIsNone(get_roster_last_updated())
+        self.assertEqual(get_last_updated.call_count, 2)
+
+    @override_settings(ROSTER_LAST_UPDATED_CACHE_TIMEOUT=0)
+    @patch('analytics_data_api.v0.models.RosterUpdate.get_last_updated')
+    def test_expired(self, get_last_updated):
+        get_last_updated.return_value = [Mock(date=datetime.date(2015, 9, 28))]
+        self.assertEqual(get_roster_last_updated(), datetime.date(2015, 9, 28))
+        get_last_updated.return_value = [Mock(date=datetime.date(2015, 9, 29))]
+        self.assertEqual(get_roster_last_updated(), datetime.date(2015, 9, 29))
+        self.assertEqual(get_last_updated.call_count, 2)
+
+
+class CourseLearnerMetadataCacheTests(TestCaseWithAuthentication):
+    """Tests for the caching of the learner counts of a course."""
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    @patch('analytics_data_api.v0.models.RosterEntry.get_course_metadata')
+    def test_cached_until_roster_update(self, get_course_metadata):
+        course_id = CourseSamples.course_ids[0]
+        get_course_metadata.return_value = {'cohorts': {'Team edX': 1}}
+        for _ in range(2):
+            self.assertDictEqual(get_course_learner_metadata(course_id, datetime.date(2015, 9, 28)),
+                                 {'cohorts': {'Team edX': 1}})
+        self.assertEqual(get_course_metadata.call_count, 1)
+
+        get_course_metadata.return_value = {'cohorts': {'Team edX': 2}}
+        self.assertDictEqual(get_course_learner_metadata(course_id, datetime.date(2015, 9, 29)),
+                             {'cohorts': {'Team edX': 2}})
+        get_course_learner_metadata(CourseSamples.course_ids[1], datetime.date(2015, 9, 29))
+        get_course_learner_metadata(course_id, None)
+        self.assertEqual(get_course_metadata.call_count, 4)
+
+
 @ddt.ddt
 class LearnerTests(VerifyCourseIdMixin, LearnerAPITestMixin, TestCaseWithAuthentication):
     """Tests for the single learner endpoint."""
@@ -224,6 +290,22 @@ class LearnerTests(VerifyCourseIdMixin, LearnerAPITestMixin, TestCaseWithAuthent
         }
         self.assertDictEqual(expected, response.data)
 
+    @ddt.data(
+        ({'fields': 'username,engagements'}, ['username', 'engagements']),
+        ({'fields': 'username,last_updated', 'exclude': 'last_updated'}, ['username']),
+    )
+    @ddt.unpack
+    def test_get_user_fields(self, params, expected_fields):
+        course_id = 'edX/DemoX/Demo_Course'
+        self.create_learners([{'username': 'ed_xavier', 'course_id': course_id, 'videos_viewed': 6}])
+        self.create_update_index('2015-08-05')
+
+        response = self.authenticated_get('/api/v0/learners/ed_xavier/', dict(params, course_id=course_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(list(response.data.keys()), expected_fields)
+        if 'engagements' in expected_fields:
+            self.assertEqual(response.data['engagements']['videos_viewed'], 6)
+
     @patch('analytics_data_api.v0.models.RosterEntry.get_course_user', Mock(return_value=[]))
     def test_not_found(self):
         user_name = 'a_user'
@@ -472,6 +554,64 @@ class LearnerListTests(LearnerAPITestMixin, VerifyCourseIdMixin, TestCaseWithAut
         )
         self.assert_learners_returned(response, [{'username': 'e'}])
 
+    def test_fields(self):
+        self.create_learners([
+            {'username': username, 'course_id': self.course_id, 'problems_attempted': problems_attempted}
+            for username, problems_attempted in (('a', 1), ('b', 2))
+        ])
+        response = self._get(self.course_id, fields='username,engagements', order_by='problems_attempted',
+                             sort_order='desc')
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content.decode('utf-8'))['results']
+        self.assertListEqual([list(result.keys()) for result in results], [['username', 'engagements']] * 2)
+        self.assertListEqual([result['username'] for result in results], ['b', 'a'])
+
+        response = self._get(self.course_id, exclude='engagements,mailing_address,goals')
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content.decode('utf-8'))['results']
+        self.assertTrue(results)
+        for result in results:
+            self.assertNotIn('engagements', result)
+            self.assertIn('email', result)
+
+    @ddt.data(
+        ({}, ['a', 'b', 'c', 'd', 'e']),
+        ({'order_by': 'problems_attempted', 'sort_order': 'desc'}, ['c', 'e', 'a', 'b', 'd']),
+        ({'order_by': 'problem_attempts_per_completed', 'sort_order': 'asc'}, ['e', 'a', 'b', 'c', 'd']),
+    )
+    @ddt.unpack
+    def test_cursor_pagination(self, params, expected_usernames):
+        self.create_learners([
+            {'username': 'a', 'course_id': self.course_id, 'problems_attempted': 2,
+             'problem_attempts_per_completed': 2.0, 'attempt_ratio_order': 2},
+            {'username': 'b', 'course_id': self.course_id, 'problems_attempted': 2,
+             'problem_attempts_per_completed': 2.0, 'attempt_ratio_order': 2},
+            {'username': 'c', 'course_id': self.course_id, 'problems_attempted': 3},
+            {'username': 'd', 'course_id': self.course_id},
+            {'username': 'e', 'course_id': self.course_id, 'problems_attempted': 3,
+             'problem_attempts_per_completed': 1.5, 'attempt_ratio_order': 3},
+        ])
+
+        usernames = []
+        response = self._get(self.course_id, page_size=2, cursor='', **params)
+        while True:
+            payload = json.loads(response.content.decode('utf-8'))
+            self.assertIsNone(payload['previous'])
+            self.assertNotIn('count', payload)
+            self.assertLessEqual(len(payload['results']), 2)
+            usernames.extend(learner['username'] for learner in payload['results'])
+            if payload['next'] is None:
+                break
+            self.assertEqual(response['Link'], '<{}>; rel="next"'.format(payload['next']))
+            response = self.authenticated_get(payload['next'])
+            self.assertEqual(response.status_code, 200)
+
+        self.assertListEqual(usernames, expected_usernames)
+
+    def test_cursor_pagination_invalid_cursor(self):
+        response = self._get(self.course_id, cursor='not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
     # Error cases
     @ddt.data(
         ({}, 'course_not_specified'),
@@ -580,6 +720,29 @@ class LearnerCsvListTests(LearnerAPITestMixin, VerifyCourseIdMixin,
             self.assertCsvResponseIsValid(response, self.get_csv_filename(), expected_data, {'Link': expected_links})
             prev_page = page
 
+    @ddt.data([], ['username', 'cohort', 'last_updated'])
+    @override_settings(ELASTICSEARCH_LEARNERS_EXPORT_BATCH_SIZE=2)
+    def test_csv_export(self, fields):
+        """ Verify the endpoint streams all the learners when exporting, in batches. """
+        usernames = ['victor', 'olga', 'gabe', 'dan', 'alison']
+        commaCohort = 'Lions, Tigers, & Bears'
+        self.create_learners([{'username': username, 'course_id': self.course_id, 'cohort': commaCohort}
+                              for username in usernames])
+        params = dict(course_id=self.course_id, order_by='username', sort_order='desc', fields=','.join(fields))
+
+        expected = self.authenticated_get(self.path, dict(params, page_size=len(usernames)), True,
+                                          HTTP_ACCEPT='text/csv')
+        with patch.object(Elasticsearch, 'clear_scroll', autospec=True,
+                          side_effect=Elasticsearch.clear_scroll) as clear_scroll:
+            response = self.authenticated_get(self.path, dict(params, export='true'), True, HTTP_ACCEPT='text/csv')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'].split(';')[0], 'text/csv')
+            self.assertEqual(response['Content-Disposition'], f'attachment; filename={self.get_csv_filename()}')
+            self.assertIsNone(response.get('Link'))
+            self.assertEqual(b''.join(response.streaming_content), expected.content)
+        # The scroll is cleared once the export ends
+        clear_scroll.assert_called_once()
+
     @ddt.data(
         # fields deliberately out of alphabetical order
         (['username', 'cohort', 'last_updated', 'email'],
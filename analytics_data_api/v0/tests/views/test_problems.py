@@ -6,6 +6,11 @@
 
 import json
 
+import ddt
+from django.conf import settings
+from django.core.cache import caches
+from django.test.utils import override_settings
+from django.utils.http import urlencode
 from django_dynamic_fixture import G
 
 from analytics_data_api.v0 import models
@@ -14,9 +19,11 @@ from analytics_data_api.v0.serializers import (
     ProblemFirstLastResponseAnswerDistributionSerializer,
     SequentialOpenDistributionSerializer,
 )
+from analytics_data_api.v0.views.problems import ProblemResponseAnswerDistributionView
 from analyticsdataserver.tests import TestCaseWithAuthentication
 
 
+@ddt.ddt
 class AnswerDistributionTests(TestCaseWithAuthentication):
     path = '/answer_distribution/'
     maxDiff = None
@@ -133,10 +140,81 @@ class AnswerDistributionTests(TestCaseWithAuthentication):
 
         self.assertEqual(set(response.data), set(expected_data))
 
+    def test_consolidate_answers(self):
+        """ Verify that a part is left untouched if one of its values cannot be consolidated. """
+        def answer(value_id, variant, count, correct=True):
+            return {'value_id': value_id, 'variant': variant, 'count': count, 'correct': correct,
+                    'question_text': 'Q', 'answer_value': value_id, 'problem_display_name': 'P'}
+
+        problem = [answer('a', 1, 2), answer('a', 2, 3), answer('b', 1, 4)]
+        self.assertListEqual(ProblemResponseAnswerDistributionView.consolidate_answers(problem, ('count',)), [
+            dict(answer('a', None, 5), consolidated_variant=True),
+            answer('b', 1, 4),
+        ])
+
+        problem = [answer('a', 1, 2), answer('a', 2, 3), answer('b', 1, 4), answer('b', 2, 5, correct=False)]
+        expected = [dict(a) for a in problem]
+        self.assertListEqual(ProblemResponseAnswerDistributionView.consolidate_answers(problem, ('count',)), expected)
+
     def test_get_404(self):
         response = self.authenticated_get('/api/v0/problems/%s%s' % ("DOES-NOT-EXIST", self.path))
         self.assertEqual(response.status_code, 404)
 
+    @ddt.data(500, 1)
+    def test_bulk_get(self, batch_size):
+        """ Verify that the distributions of many problems match those of each problem. """
+        module_ids = [self.module_id1, self.module_id2]
+        expected = {
+            module_id: self.authenticated_get(f'/api/v0/problems/{module_id}{self.path}').data
+            for module_id in module_ids
+        }
+
+        with override_settings(BULK_ID_LOOKUP_BATCH_SIZE=batch_size):
+            responses = [
+                self.authenticated_get('/api/v0/problems{}?{}'.format(
+                    self.path, urlencode({'problem_ids': ','.join(module_ids + ['DOES-NOT-EXIST'])}))),
+                self.authenticated_post(f'/api/v0/problems{self.path}', data={'problem_ids': module_ids}),
+            ]
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertCountEqual(response.data.keys(), module_ids)
+            for module_id in module_ids:
+                self.assertCountEqual(response.data[module_id], expected[module_id])
+
+    @override_settings(STREAM_UNFILTERED_LIST_RESPONSES=True, BULK_ID_LOOKUP_BATCH_SIZE=1)
+    def test_bulk_get_streamed(self):
+        """ Verify that the streamed distributions of many problems match those that are not streamed. """
+        path = '/api/v0/problems{}?{}'.format(
+            self.path, urlencode({'problem_ids': ','.join([self.module_id1, self.module_id2])}))
+        with override_settings(STREAM_UNFILTERED_LIST_RESPONSES=False):
+            expected = self.authenticated_get(path)
+        response = self.authenticated_get(path)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content)
+        self.assertDictEqual(json.loads(content.decode('utf-8')), json.loads(expected.content.decode('utf-8')))
+
+        response = self.authenticated_get(f'/api/v0/problems{self.path}?problem_ids=DOES-NOT-EXIST')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_bulk_post_response_cache(self):
+        """ Verify that POSTs for different problems are not served each other's cached distributions. """
+        caches[settings.RESPONSE_CACHE_ALIAS].clear()
+        # The problems were loaded together, so they share the data version the entries are keyed on
+        models.ProblemFirstLastResponseAnswerDistribution.objects.update(created=self.ad1.created)
+        for module_id in (self.module_id1, self.module_id2):
+            response = self.authenticated_post(f'/api/v0/problems{self.path}', data={'problem_ids': [module_id]})
+            self.assertEqual(response.status_code, 200)
+            self.assertListEqual(list(response.data.keys()), [module_id])
+
+    def test_bulk_get_404(self):
+        response = self.authenticated_get(f'/api/v0/problems{self.path}?problem_ids=DOES-NOT-EXIST')
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_get_without_ids(self):
+        response = self.authenticated_get(f'/api/v0/problems{self.path}')
+        self.assertEqual(response.status_code, 400)
+
 
 class GradeDistributionTests(TestCaseWithAuthentication):
     path = '/grade_distribution/'
@@ -1,10 +1,13 @@
 from unittest.mock import Mock
 
 import ddt
+from django.core.cache import cache
 from django.http import Http404
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django_dynamic_fixture import G
 
 import analytics_data_api.v0.views.utils as utils
+from analytics_data_api.v0 import models
 from analytics_data_api.v0.exceptions import CourseKeyMalformedError  # pylint: disable=ungrouped-imports
 from analytics_data_api.v0.tests.views import CourseSamples
 
@@ -46,3 +49,52 @@ class UtilsTest(TestCase):
     def test_raise_404_if_none_passes_through(self):
         decorated_func = utils.raise_404_if_none(Mock(return_value='Not a 404'))
         self.assertEqual(decorated_func(self), 'Not a 404')
+
+    @ddt.data(
+        ([], 2, []),
+        (['a', 'b', 'c'], 2, [['a', 'b'], ['c']]),
+        (['a', 'b'], 2, [['a', 'b']]),
+    )
+    @ddt.unpack
+    def test_batched(self, items, batch_size, expected):
+        self.assertListEqual(list(utils.batched(items, batch_size)), expected)
+
+    def test_pivot_counts(self):
+        rows = [
+            ('course', 1, 10, 'a', 1, 5),
+            ('course', 1, 12, 'b', 2, 6),
+            ('course', 1, 11, 'b2', 3, 7),
+            ('course', 1, 11, 'other', 4, 8),
+            ('course', 2, 20, 'a', 5, 9),
+        ]
+        column_indexes = {'a': 0, 'b': 1, 'b2': 1}
+        self.assertListEqual(list(utils.pivot_counts(rows, ['a', 'b'], column_indexes, totals=['total'])), [
+            {'course_id': 'course', 'date': 1, 'created': 12, 'a': 1, 'b': 5, 'total': 26},
+            {'course_id': 'course', 'date': 2, 'created': 20, 'a': 5, 'b': 0, 'total': 9},
+        ])
+        self.assertListEqual(list(utils.pivot_counts([row[:5] for row in rows[:4]], ['a', 'b'], {'a': 0}, 1)), [
+            {'course_id': 'course', 'date': 1, 'created': 12, 'a': 1, 'b': 9},
+        ])
+
+    @override_settings(LAST_MODIFIED_CACHE_TIMEOUT=60)
+    def test_get_max_created_cached(self):
+        cache.clear()
+        course_id = CourseSamples.course_ids[0]
+        queryset = models.CourseEnrollmentDaily.objects.filter(course_id=course_id)
+        self.assertIsNone(utils.get_max_created(queryset))
+
+        enrollment = G(models.CourseEnrollmentDaily, course_id=course_id)
+        with self.assertNumQueries(0):
+            self.assertIsNone(utils.get_max_created(queryset))
+
+        utils.clear_max_created(queryset)
+        with self.assertNumQueries(1):
+            self.assertEqual(utils.get_max_created(queryset), enrollment.created)
+        with self.assertNumQueries(0):
+            self.assertEqual(utils.get_max_created(queryset), enrollment.created)
+
+    def test_get_max_created_uncached(self):
+        queryset = models.CourseEnrollmentDaily.objects.filter(course_id=CourseSamples.course_ids[0])
+        self.assertIsNone(utils.get_max_created(queryset))
+        enrollment = G(models.CourseEnrollmentDaily, course_id=CourseSamples.course_ids[0])
+        self.assertEqual(utils.get_max_created(queryset), enrollment.created)
@@ -12,6 +12,7 @@ urlpatterns = [
     url(r'^videos/', include('analytics_data_api.v0.urls.videos')),
     url('^', include('analytics_data_api.v0.urls.learners')),
     url('^', include('analytics_data_api.v0.urls.course_summaries')),
+    url('^', include('analytics_data_api.v0.urls.course_activities')),
     url('^', include('analytics_data_api.v0.urls.programs')),
 
     # pylint: disable=no-value-for-parameter
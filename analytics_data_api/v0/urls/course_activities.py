@@ -0,0 +1,9 @@
+from django.conf.urls import url
+
+from analytics_data_api.v0.views import course_activities as views
+
+app_name = 'course_activities'
+
+urlpatterns = [
+    url(r'^course_activities/$', views.CourseActivitiesView.as_view(), name='course_activities'),
+]
@@ -14,8 +14,11 @@ COURSE_URLS = [
     ('enrollment/education', views.CourseEnrollmentByEducationView, 'enrollment_by_education'),
     ('enrollment/gender', views.CourseEnrollmentByGenderView, 'enrollment_by_gender'),
     ('enrollment/location', views.CourseEnrollmentByLocationView, 'enrollment_by_location'),
+    ('enrollment/all', views.CourseEnrollmentAllView, 'enrollment_all'),
     ('problems', views.ProblemsListView, 'problems'),
     ('problems_and_tags', views.ProblemsAndTagsListView, 'problems_and_tags'),
+    ('grade_distribution', views.CourseGradeDistributionView, 'grade_distribution'),
+    ('sequential_open_distribution', views.CourseSequentialOpenDistributionView, 'sequential_open_distribution'),
     ('videos', views.VideosListView, 'videos'),
     ('reports/(?P<report_name>[a-zA-Z0-9_]+)', views.ReportDownloadView, 'reports'),
     ('user_engagement', views.UserEngagementView, 'user_engagement'),
@@ -12,6 +12,7 @@ PROBLEM_URLS = [
 ]
 
 urlpatterns = [
+    url(r'^answer_distribution/$', views.ProblemsAnswerDistributionView.as_view(), name='answer_distributions'),
     url(r'^(?P<module_id>.+)/sequential_open_distribution/$',
         views.SequentialOpenDistributionView.as_view(), name='sequential_open_distribution'),
 ]
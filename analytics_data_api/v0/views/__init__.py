@@ -1,14 +1,30 @@
-from functools import reduce as functools_reduce
-from itertools import groupby
-
-from django.db import models
+import json
+from calendar import timegm
+from hashlib import md5
+from itertools import chain, groupby
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
 from django.db.models import Q
+from django.http import Http404, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date, urlencode
 from opaque_keys.edx.keys import CourseKey
 from rest_framework import generics, serializers
+from rest_framework.response import Response
 
+from analytics_data_api.renderers import StreamingDynamicFieldsCsvRenderer, StreamingJSONRenderer
 from analytics_data_api.v0.exceptions import CourseNotSpecifiedError
-from analytics_data_api.v0.views.utils import raise_404_if_none, split_query_argument, validate_course_id
+from analytics_data_api.v0.views.utils import (
+    batched,
+    get_max_created,
+    get_model_field_names,
+    raise_404_if_none,
+    split_query_argument,
+    validate_course_id,
+)
 
 
 class CourseViewMixin:
@@ -27,6 +43,179 @@ class CourseViewMixin:
         return super().get(request, *args, **kwargs)
 
 
+class ConditionalResponseMixin:
+    """
+    Supports conditional GET requests, using the time that the requested data was last loaded.
+
+    Responses are augmented with these headers:
+
+    * ETag: identifies the data version and representation of the response.
+    * Last-Modified: the time the requested data was last modified.
+
+    If the client's copy is current (If-None-Match/If-Modified-Since), a 304 is returned before
+    the data is queried or serialized. Views implement get_last_modified() to cheaply determine
+    when their data was last modified, e.g. from the max `created` timestamp of the course, which
+    get_max_created caches for LAST_MODIFIED_CACHE_TIMEOUT seconds so that most requests cost no query.
+    The value is kept in `last_modified` for the rest of the request, and views that read newer
+    data than it (e.g. after it was cached) advance it, so that the validators match the response.
+    """
+    last_modified = None
+
+    def get_last_modified(self):
+        """
+        Returns the time the requested data was last modified, or None if unknown,
+        in which case the request is not conditional.
+        """
+        return None
+
+    def get_etag(self, request, last_modified):
+        """
+        Returns the ETag for the given data version, distinguishing the representations
+        (e.g. JSON and CSV) of the same resource.
+        """
+        version = '{}|{}'.format(last_modified.isoformat(), request.accepted_media_type)
+        return quote_etag(md5(version.encode('utf-8')).hexdigest())
+
+    def requires_last_modified(self):
+        """Returns whether the time the data was last modified is needed even if the request is not conditional."""
+        return False
+
+    def get(self, request, *args, **kwargs):
+        enabled = request.method in ('GET', 'HEAD') and getattr(settings, 'CONDITIONAL_RESPONSES_ENABLED', False)
+        if not (enabled or self.requires_last_modified()):
+            return super().get(request, *args, **kwargs)
+
+        last_modified = self.last_modified = self.get_last_modified()
+        if last_modified is None:
+            return super().get(request, *args, **kwargs)
+        if not enabled:
+            return self.get_modified_response(request, last_modified, *args, **kwargs)
+
+        etag = self.get_etag(request, last_modified)
+        timestamp = timegm(last_modified.utctimetuple())
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = self.get_modified_response(request, last_modified, *args, **kwargs)
+            if self.last_modified != last_modified:
+                # The view read data loaded after the cached time it was last modified.
+                etag = self.get_etag(request, self.last_modified)
+                timestamp = timegm(self.last_modified.utctimetuple())
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def get_modified_response(self, request, last_modified, *args, **kwargs):  # pylint: disable=unused-argument
+        """
+        Returns the full response for a request that was not short-circuited,
+        given the time the requested data was last modified.
+        """
+        return super().get(request, *args, **kwargs)
+
+
+class ResponseCacheMixin(ConditionalResponseMixin):
+    """
+    Caches the serialized data of responses.
+
+    Entries are keyed on the method, the normalized path, the sorted query and body parameters, the
+    accepted media type and the time the requested data was last modified (see ConditionalResponseMixin), so they are
+    superseded as soon as the pipeline loads new data for the course.
+
+    The cache is configured by these settings:
+
+    * RESPONSE_CACHE_ENABLED: whether responses are cached.
+    * RESPONSE_CACHE_ALIAS: the entry of CACHES to use, which determines the backend and its eviction policy.
+    * RESPONSE_CACHE_TIMEOUTS: timeouts (in seconds) by view class name, overriding the cache's default.
+
+    The hits and misses of each view are counted in the cache (see get_response_cache_stats), so they
+    can only be read from another process, e.g. by response_cache_stats, if the cache is shared.
+    """
+    response_cache_key_prefix = 'response'
+
+    @staticmethod
+    def get_response_cache():
+        return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', DEFAULT_CACHE_ALIAS)]
+
+    @staticmethod
+    def get_request_body_key(request):
+        """
+        Returns the normalized parameters in the body of the request, e.g. the IDs of a POST to a list endpoint,
+        which select the data as much as the query parameters do.
+        """
+        if request.method in ('GET', 'HEAD'):
+            return ''
+        data = request.data
+        if hasattr(data, 'lists'):
+            data = dict(data.lists())
+        return json.dumps(data, sort_keys=True, default=str)
+
+    def get_response_cache_key(self, request, last_modified):
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        key = '|'.join([
+            request.method, request.path.rstrip('/'), query, self.get_request_body_key(request),
+            request.accepted_media_type, last_modified.isoformat(),
+        ])
+        return '{}:{}:{}'.format(
+            self.response_cache_key_prefix, type(self).__name__, md5(key.encode('utf-8')).hexdigest()
+        )
+
+    @classmethod
+    def get_response_cache_stat_key(cls, stat):
+        return f'{cls.response_cache_key_prefix}_stats:{cls.__name__}:{stat}'
+
+    def increment_response_cache_stat(self, stat):
+        cache = self.get_response_cache()
+        key = self.get_response_cache_stat_key(stat)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The counter was evicted between add() and incr(), so start over
+            cache.set(key, 1, None)
+
+    @classmethod
+    def get_response_cache_stats(cls):
+        """Returns the response cache hits and misses of this view and its subclasses, by view class name."""
+        cache = cls.get_response_cache()
+        stats = {}
+        views = [cls]
+        seen = {cls}
+        while views:
+            view = views.pop()
+            subclasses = set(view.__subclasses__()) - seen
+            seen.update(subclasses)
+            views.extend(subclasses)
+            counts = cache.get_many([view.get_response_cache_stat_key(stat) for stat in ('hits', 'misses')])
+            if counts:
+                stats[view.__name__] = {
+                    stat: counts.get(view.get_response_cache_stat_key(stat), 0) for stat in ('hits', 'misses')
+                }
+        return stats
+
+    def requires_last_modified(self):
+        return getattr(settings, 'RESPONSE_CACHE_ENABLED', False)
+
+    def get_modified_response(self, request, last_modified, *args, **kwargs):
+        if not self.requires_last_modified():
+            return super().get_modified_response(request, last_modified, *args, **kwargs)
+
+        cache = self.get_response_cache()
+        key = self.get_response_cache_key(request, last_modified)
+        data = cache.get(key)
+        if data is not None:
+            self.increment_response_cache_stat('hits')
+            return Response(data)
+
+        self.increment_response_cache_stat('misses')
+        response = super().get_modified_response(request, last_modified, *args, **kwargs)
+        # Streamed responses are not cached, since their data is not held in memory.
+        if response.status_code == 200 and isinstance(response, Response):
+            timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUTS', {}).get(type(self).__name__, DEFAULT_TIMEOUT)
+            cache.set(self.get_response_cache_key(request, self.last_modified), response.data, timeout)
+        return response
+
+
 class PaginatedHeadersMixin:
     """
     If the response is paginated, then augment it with this response header:
@@ -49,7 +238,8 @@ class PaginatedHeadersMixin:
         Stores pagination links in a response header.
         """
         response = super().get(request, args, kwargs)
-        link = self.get_paginated_links(response.data)
+        # Streamed responses have no data, and are not paginated.
+        link = self.get_paginated_links(getattr(response, 'data', None))
         if link:
             response['Link'] = link
         return response
@@ -105,7 +295,48 @@ class CsvViewMixin:
         return super().finalize_response(request, response, *args, **kwargs)
 
 
-class APIListView(generics.ListAPIView):
+class StreamingListMixin:
+    """
+    Streams list responses in the formats that can be rendered one item at a time, when
+    STREAM_UNFILTERED_LIST_RESPONSES is set, rather than building them in memory.
+    """
+    # Renderers used to stream the list, by format of the accepted renderer
+    streaming_renderer_classes = {
+        'json': StreamingJSONRenderer,
+        'csv': StreamingDynamicFieldsCsvRenderer,
+    }
+
+    def get_streaming_renderer_class(self, request):
+        """Returns the renderer to stream the response with, or None if it should not be streamed."""
+        if not getattr(settings, 'STREAM_UNFILTERED_LIST_RESPONSES', False):
+            return None
+        return self.streaming_renderer_classes.get(request.accepted_renderer.format)
+
+    def get_streaming_response(self, renderer_class, items):
+        """Returns a response streaming the serialized items with the given renderer."""
+        serializer = self.get_serializer()
+        return self.get_streaming_results_response(
+            renderer_class, (serializer.to_representation(item) for item in items))
+
+    def get_streaming_results_response(self, renderer_class, results):
+        """Returns a response streaming the already serialized results with the given renderer."""
+        results = iter(results)
+        # Read the first result before responding, so that an empty list is still a 404.
+        first_result = next(results, None)
+        if first_result is None:
+            raise Http404
+
+        renderer = renderer_class()
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        return StreamingHttpResponse(
+            renderer.render(chain([first_result], results), renderer_context=self.get_renderer_context()),
+            content_type=content_type,
+        )
+
+
+class APIListView(StreamingListMixin, ResponseCacheMixin, generics.ListAPIView):
     """
     An abstract view to store common code for views that return a list of data.
 
@@ -167,6 +398,8 @@ class APIListView(generics.ListAPIView):
         * GET is usable when the number of IDs is relatively low
         * POST is required when the number of course IDs would cause the URL to be too long.
         * POST functions the same as GET here. It does not modify any state.
+        * When STREAM_UNFILTERED_LIST_RESPONSES is set, JSON and CSV responses for the full
+          list (no IDs given) are streamed as the rows are read, rather than built in memory.
     """
     ids = None
     fields = None
@@ -181,7 +414,7 @@ class APIListView(generics.ListAPIView):
             'fields': self.fields,
             'exclude': self.exclude
         })
-        return self.get_serializer_class()(*args, **kwargs)
+        return self.get_serializer_class()(*args, **kwargs)  # pylint: disable=not-callable
 
     def get(self, request, *args, **kwargs):
         query_params = self.request.query_params
@@ -221,8 +454,7 @@ class APIListView(generics.ListAPIView):
         return field_dict
 
     def update_field_dict_from_model(self, model, base_field_dict=None, field_list=None):
-        field_list = (field_list if field_list else
-                      [f.name for f in self.model._meta.get_fields()])  # pylint: disable=protected-access
+        field_list = field_list if field_list else get_model_field_names(self.model)
         field_dict = base_field_dict if base_field_dict else {}
         field_dict.update({field: getattr(model, field) for field in field_list})
         return field_dict
@@ -231,31 +463,79 @@ class APIListView(generics.ListAPIView):
         """Applies some business logic to final result without access to any data from the original model."""
         return field_dict
 
+    def get_rows(self, queryset):
+        """
+        Return the rows of `queryset` that are aggregated by `group_by_id`.
+        By default, these are model instances.
+        """
+        return queryset
+
     def group_by_id(self, queryset):
         """Return results aggregated by a distinct ID."""
-        aggregate_field_dict = []
+        return list(self.iter_group_by_id(queryset))
+
+    def iter_group_by_id(self, queryset):
+        """Yield results aggregated by a distinct ID, one ID at a time."""
         for item_id, model_group in groupby(queryset, lambda x: (getattr(x, self.model_id_field))):
             field_dict = self.base_field_dict(item_id)
 
             for model in model_group:
                 field_dict = self.update_field_dict_from_model(model, base_field_dict=field_dict)
 
-            field_dict = self.postprocess_field_dict(field_dict)
-            aggregate_field_dict.append(field_dict)
+            yield self.postprocess_field_dict(field_dict)
+
+    def get_last_modified(self):
+        """Returns the max `created` timestamp of the requested IDs."""
+        if not self.ids:
+            return get_max_created(self.model.objects.all())
 
-        return aggregate_field_dict
+        batch_size = getattr(settings, 'BULK_ID_LOOKUP_BATCH_SIZE', 500)
+        created = [
+            get_max_created(self.model.objects.filter(self.get_query(id_batch)))
+            for id_batch in batched(sorted(set(self.ids)), batch_size)
+        ]
+        return max(filter(None, created), default=None)
 
-    def get_query(self):
-        return functools_reduce(lambda q, item_id: q | Q(id=item_id), self.ids, Q())
+    def get_query(self, ids):
+        return Q(**{f'{self.model_id_field}__in': ids})
+
+    def filter_by_ids(self, ids):
+        """
+        Return an iterable over the rows matching `ids`.
+
+        The IDs are de-duplicated, sorted and looked up in batches of
+        BULK_ID_LOOKUP_BATCH_SIZE, so that the size of each IN clause stays bounded
+        no matter how many IDs are requested. Since the batches are sorted, the
+        chained results stay grouped by ID for `group_by_id`.
+        """
+        batch_size = getattr(settings, 'BULK_ID_LOOKUP_BATCH_SIZE', 500)
+        return chain.from_iterable(
+            self.get_rows(self.model.objects.filter(self.get_query(id_batch)))
+            for id_batch in batched(sorted(set(ids)), batch_size)
+        )
 
     @raise_404_if_none
     def get_queryset(self):
         if self.ids:
-            queryset = self.model.objects.filter(self.get_query())
+            queryset = self.filter_by_ids(self.ids)
         else:
-            queryset = self.model.objects.all()
+            queryset = self.get_rows(self.model.objects.all())
 
         field_dict = self.group_by_id(queryset)
 
         # Django-rest-framework will serialize this dictionary to a JSON response
         return field_dict
+
+    def stream_field_dicts(self):
+        """
+        Yield the results for all IDs, reading the rows with `iterator()` so that
+        they are not all loaded into memory at once.
+        """
+        return self.iter_group_by_id(self.get_rows(self.model.objects.all()).iterator())
+
+    def list(self, request, *args, **kwargs):
+        renderer_class = self.get_streaming_renderer_class(request)
+        if self.ids or renderer_class is None:
+            return super().list(request, *args, **kwargs)
+
+        return self.get_streaming_response(renderer_class, self.stream_field_dicts())
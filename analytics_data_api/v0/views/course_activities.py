@@ -0,0 +1,121 @@
+from django.db.models import Max, OuterRef, Subquery
+from django.utils.timezone import utc
+
+from analytics_data_api.v0 import models, serializers
+from analytics_data_api.v0.views import APIListView
+from analytics_data_api.v0.views.courses import BaseCourseView, CourseActivityWeeklyView
+from analytics_data_api.v0.views.utils import validate_course_id
+
+
+class CourseActivitiesView(APIListView):
+    """
+    Returns the weekly activity of many courses at once.
+
+    **Example Requests**
+
+        GET /api/v0/course_activities/?course_ids={course_id_1},{course_id_2}&start_date=2014-12-01
+
+        POST /api/v0/course_activities/
+        {
+            "course_ids": [
+                "{course_id_1}",
+                "{course_id_2}",
+                ...
+                "{course_id_200}"
+            ],
+            "start_date": "2014-12-01"
+        }
+
+    **Response Values**
+
+        Returns the counts of users who performed each activity, for each week and course, as
+        GET /api/v0/courses/{course_id}/activity/ does for a single course. The results are
+        ordered by course and week:
+
+            * any: The number of unique users who performed any action in the course, including
+              actions not counted in other categories in the response.
+            * attempted_problem: The number of unique users who answered any loncapa-based problem
+              in the course.
+            * played_video: The number of unique users who started watching any video in the course.
+            * posted_forum: The number of unique users who created a new post, responded to a post,
+              or submitted a comment on any discussion in the course.
+            * interval_start: The time and date at which data started being included in returned values.
+            * interval_end: The time and date at which data stopped being included in returned values.
+            * course_id: The ID of the course for which data is returned.
+            * created: The date the counts were computed.
+
+    **Parameters**
+
+        Results can be filtered to the course IDs and dates specified or limited to the fields.
+
+        For GET requests, these parameters are passed in the query string.
+        For POST requests, these parameters are passed as a JSON dict in the request body.
+
+        course_ids -- The comma-separated course identifiers for which activity is requested.
+            For example, 'edX/DemoX/Demo_Course,course-v1:edX+DemoX+Demo_2016'. Default is to
+            return all courses.
+        start_date -- Date after which all data is returned (inclusive).
+        end_date -- Date before which all data is returned (exclusive).
+        fields -- The comma-separated fields to return in the response.
+            For example, 'course_id,any'. Default is to return all fields.
+        exclude -- The comma-separated fields to exclude in the response.
+            For example, 'course_id,created'. Default is to not exclude any fields.
+
+        You specify dates in the format: YYYY-mm-ddTtttttt or YYYY-mm-dd; for example,
+        ``2014-12-15T000000``. If no start or end dates are specified, the data for the most
+        recent week of each course is returned.
+
+    **Notes**
+
+        * GET is usable when the number of course IDs is relatively low
+        * POST is required when the number of course IDs would cause the URL to be too long.
+        * POST functions the same as GET for this endpoint. It does not modify any state.
+        * The activity of all requested courses is read with one query per batch of
+          BULK_ID_LOOKUP_BATCH_SIZE courses.
+    """
+    serializer_class = serializers.CourseActivitiesSerializer
+    model = models.CourseActivityWeekly
+    model_id_field = 'course_id'
+    ids_param = 'course_ids'
+    start_date = None
+    end_date = None
+
+    def get(self, request, *args, **kwargs):
+        self.set_dates(request.query_params.get('start_date'), request.query_params.get('end_date'))
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        self.set_dates(request.data.get('start_date'), request.data.get('end_date'))
+        return super().post(request, *args, **kwargs)
+
+    def set_dates(self, start_date, end_date):
+        self.start_date = BaseCourseView.parse_date(start_date, utc)
+        self.end_date = BaseCourseView.parse_date(end_date, utc)
+
+    def verify_ids(self):
+        """
+        Raise an exception if any of the course IDs set as self.ids are invalid.
+        Overrides APIListView.verify_ids.
+        """
+        if self.ids is not None:
+            for item_id in self.ids:
+                validate_course_id(item_id)
+
+    def get_rows(self, queryset):
+        if self.start_date or self.end_date:
+            if self.start_date:
+                queryset = queryset.filter(interval_start__gte=self.start_date)
+            if self.end_date:
+                queryset = queryset.filter(interval_end__lt=self.end_date)
+        else:
+            # No date filter supplied, so only return the latest week of each course
+            latest_interval_ends = self.model.objects.filter(course_id=OuterRef('course_id')).order_by() \
+                .values('course_id').annotate(latest_interval_end=Max('interval_end')).values('latest_interval_end')
+            queryset = queryset.filter(interval_end=Subquery(latest_interval_ends))
+
+        # Sorted by course and week, so that the activity of each week is grouped together
+        return queryset.order_by('course_id', 'interval_start', 'interval_end')
+
+    def iter_group_by_id(self, queryset):
+        """Yields a result for each course and week, combining its activity types."""
+        return CourseActivityWeeklyView.iter_formatted_data(queryset)
@@ -1,13 +1,49 @@
+from collections import defaultdict
 from datetime import datetime
-from functools import reduce as functools_reduce
+from functools import reduce
+from itertools import groupby
+from operator import itemgetter, or_
 
-from django.db.models import Q
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db.models import Case, F, IntegerField, Max, Q, Sum, When
 from django.http import HttpResponseBadRequest
 
 from analytics_data_api.constants import enrollment_modes
 from analytics_data_api.v0 import models, serializers
 from analytics_data_api.v0.views import APIListView
-from analytics_data_api.v0.views.utils import split_query_argument, validate_course_id
+from analytics_data_api.v0.views.utils import (
+    batched,
+    clear_max_created,
+    get_max_created,
+    raise_404_if_none,
+    split_query_argument,
+    validate_course_id,
+)
+
+
+class CourseSummaryAggregate:
+    """
+    Accumulates the enrollment rows of a single course.
+
+    The counts of each enrollment mode are kept as tuples, ordered as
+    CourseSummariesView.count_fields, and the totals as a list.
+    """
+    __slots__ = ('course_id', 'created', 'meta', 'mode_counts', 'totals')
+
+    def __init__(self, course_id, num_count_fields):
+        self.course_id = course_id
+        self.created = None
+        self.meta = ()
+        self.mode_counts = {}
+        self.totals = [0] * num_count_fields
+
+    def add(self, enrollment_mode, created, meta, counts):
+        # treat the most recent as the authoritative created date -- should be all the same
+        self.created = max(created, self.created) if self.created else created
+        self.meta = meta
+        self.mode_counts[enrollment_mode] = counts
+        self.totals = [total + count for total, count in zip(self.totals, counts)]
 
 
 class CourseSummariesView(APIListView):
@@ -70,9 +106,15 @@ class CourseSummariesView(APIListView):
         * GET is usable when the number of course IDs is relatively low
         * POST is required when the number of course IDs would cause the URL to be too long.
         * POST functions the same as GET for this endpoint. It does not modify any state.
+        * When COURSE_SUMMARIES_AGGREGATE_IN_DATABASE is set, the counts are summed per course
+          and enrollment mode by the database, rather than in Python.
+        * When COURSE_SUMMARIES_SNAPSHOT_ENABLED is set, the aggregated summaries are served
+          from a snapshot in the COURSE_SUMMARIES_SNAPSHOT_CACHE_ALIAS cache, keyed on the time
+          the summaries were last loaded. New loads are picked up within LAST_MODIFIED_CACHE_TIMEOUT
+          seconds; run the warm_course_summaries management command after each load to rebuild
+          the snapshot and serve them straight away.
     """
     serializer_class = serializers.CourseMetaSummaryEnrollmentSerializer
-    programs_serializer_class = serializers.CourseProgramMetadataSerializer
     model = models.CourseMetaSummaryEnrollment
     model_id_field = 'course_id'
     ids_param = 'course_ids'
@@ -81,7 +123,16 @@ class CourseSummariesView(APIListView):
                     'passing_users')  # are initialized to 0 by default
     summary_meta_fields = ['catalog_course_title', 'catalog_course', 'start_time', 'end_time',
                            'pacing_type', 'availability']  # fields to extract from summary model
+    # enrollment modes summed by the database, mapped to the modes whose counts they include
+    # (professional includes non verified professional, as merged by postprocess_field_dict)
+    database_modes = {
+        mode: [mode, enrollment_modes.PROFESSIONAL_NO_ID] if mode == enrollment_modes.PROFESSIONAL else [mode]
+        for mode in enrollment_modes.ALL if mode != enrollment_modes.PROFESSIONAL_NO_ID
+    }
     recent_date = None
+    snapshot_key_prefix = 'course_summaries_snapshot'
+    snapshot_version = None
+    snapshot_created = None
 
     def get(self, request, *args, **kwargs):
         query_params = self.request.query_params
@@ -133,35 +184,106 @@ class CourseSummariesView(APIListView):
             for item_id in self.ids:
                 validate_course_id(item_id)
 
-    def base_field_dict(self, item_id):
-        """Default summary with fields populated to default levels."""
-        summary = super().base_field_dict(item_id)
-        summary.update({
-            'created': None,
-            'enrollment_modes': {},
-        })
-        summary.update({field: 0 for field in self.count_fields})
-        summary['enrollment_modes'].update({
-            mode: {
-                count_field: 0 for count_field in self.count_fields
-            } for mode in enrollment_modes.ALL
-        })
-        return summary
+    def get_last_modified(self):
+        """
+        Returns the max `created` timestamp of the requested summaries, and of the
+        programs and daily enrollments if they are included.
 
-    def update_field_dict_from_model(self, model, base_field_dict=None, field_list=None):
-        field_dict = super().update_field_dict_from_model(model, base_field_dict=base_field_dict,
-                                                          field_list=self.summary_meta_fields)
-        field_dict['enrollment_modes'].update({
-            model.enrollment_mode: {field: getattr(model, field) for field in self.count_fields}
-        })
+        Summaries served from the snapshot were all loaded by the version of the snapshot.
+        """
+        if self.snapshot_enabled():
+            self.get_snapshot_version()
+            created = [self.snapshot_created]
+        else:
+            created = [super().get_last_modified()]
+        if 'programs' not in self.exclude:
+            created.append(get_max_created(self.programs_model.objects.all()))
+        if self.recent_date and 'recent_count_change' not in self.exclude:
+            created.append(get_max_created(models.CourseEnrollmentDaily.objects.all()))
+        return max(filter(None, created), default=None)
 
-        # treat the most recent as the authoritative created date -- should be all the same
-        field_dict['created'] = max(model.created, field_dict['created']) if field_dict['created'] else model.created
+    @staticmethod
+    def snapshot_enabled():
+        return getattr(settings, 'COURSE_SUMMARIES_SNAPSHOT_ENABLED', False)
 
-        # update totals for all counts
-        field_dict.update({field: field_dict[field] + getattr(model, field) for field in self.count_fields})
+    @staticmethod
+    def aggregate_in_database():
+        return getattr(settings, 'COURSE_SUMMARIES_AGGREGATE_IN_DATABASE', False)
 
-        return field_dict
+    def get_rows(self, queryset):
+        """
+        Fetches the summary rows as (course_id, enrollment_mode, created, *summary_meta_fields, *count_fields)
+        tuples, rather than model instances.
+
+        If COURSE_SUMMARIES_AGGREGATE_IN_DATABASE is set, the database instead groups the rows by course, returning
+        (course_id, created, *summary_meta_fields, *count_fields, *count_fields for each of database_modes).
+        """
+        if not self.aggregate_in_database():
+            return queryset.values_list('course_id', 'enrollment_mode', 'created',
+                                        *self.summary_meta_fields, *self.count_fields)
+
+        annotations = {'max_created': Max('created')}
+        annotations.update({f'max_{field}': Max(field) for field in self.summary_meta_fields})
+        annotations.update({f'sum_{field}': Sum(field) for field in self.count_fields})
+        annotations.update({
+            f'sum_{mode}_{field}': Sum(Case(
+                When(enrollment_mode__in=included_modes, then=F(field)), default=0, output_field=IntegerField()
+            ))
+            for mode, included_modes in self.database_modes.items() for field in self.count_fields
+        })
+        return queryset.order_by('course_id').values('course_id').annotate(**annotations).values_list(
+            'course_id', *annotations
+        )
+
+    def iter_group_by_id(self, queryset):
+        """Yields the summary of each course, aggregated from the rows returned by `get_rows`."""
+        if self.aggregate_in_database():
+            aggregates = (self.aggregate_database_row(row) for row in queryset)
+        else:
+            aggregates = self.aggregate_rows(queryset)
+
+        for aggregate in aggregates:
+            yield self.postprocess_field_dict(self.summary_from_aggregate(aggregate))
+
+    def aggregate_rows(self, rows):
+        """Yields the aggregate of each course, accumulated from its row for each enrollment mode."""
+        meta_end = 3 + len(self.summary_meta_fields)
+        for course_id, course_rows in groupby(rows, itemgetter(0)):
+            aggregate = CourseSummaryAggregate(course_id, len(self.count_fields))
+            for row in course_rows:
+                aggregate.add(row[1], row[2], row[3:meta_end], row[meta_end:])
+            yield aggregate
+
+    def aggregate_database_row(self, row):
+        """Returns the aggregate of a course from its row grouped by the database."""
+        num_count_fields = len(self.count_fields)
+        aggregate = CourseSummaryAggregate(row[0], num_count_fields)
+        aggregate.created = row[1]
+
+        totals_start = 2 + len(self.summary_meta_fields)
+        aggregate.meta = row[2:totals_start]
+        modes_start = totals_start + num_count_fields
+        aggregate.totals = list(row[totals_start:modes_start])
+        for index, mode in enumerate(self.database_modes):
+            mode_start = modes_start + index * num_count_fields
+            aggregate.mode_counts[mode] = row[mode_start:mode_start + num_count_fields]
+        return aggregate
+
+    def summary_from_aggregate(self, aggregate):
+        """Returns the summary dict of an aggregated course, with every enrollment mode populated."""
+        summary = {
+            self.model_id_field: aggregate.course_id,
+            'created': aggregate.created,
+        }
+        summary.update(zip(self.summary_meta_fields, aggregate.meta))
+        summary.update(zip(self.count_fields, aggregate.totals))
+
+        mode_counts = dict.fromkeys(enrollment_modes.ALL, (0,) * len(self.count_fields))
+        mode_counts.update(aggregate.mode_counts)
+        summary['enrollment_modes'] = {
+            mode: dict(zip(self.count_fields, counts)) for mode, counts in mode_counts.items()
+        }
+        return summary
 
     def postprocess_field_dict(self, field_dict):
         # Merge professional with non verified professional
@@ -175,41 +297,221 @@ class CourseSummariesView(APIListView):
         if field_dict['availability'] == 'Starting Soon':
             field_dict['availability'] = 'Upcoming'
 
-        if self.exclude == [] or (self.exclude and 'programs' not in self.exclude):
-            # don't do expensive looping for programs if we are just going to throw it away
-            field_dict = self.add_programs(field_dict)
+        return field_dict
 
-        if self.recent_date and 'recent_count_change' not in self.exclude:
-            field_dict = self.add_recent_count_change(field_dict)
+    @staticmethod
+    def get_snapshot_cache():
+        return caches[getattr(settings, 'COURSE_SUMMARIES_SNAPSHOT_CACHE_ALIAS', DEFAULT_CACHE_ALIAS)]
 
-        for field in self.exclude:
-            for mode in field_dict['enrollment_modes']:
-                _ = field_dict['enrollment_modes'][mode].pop(field, None)
+    @staticmethod
+    def get_data_created(summaries):
+        """Returns the time the summary data was last loaded, from the summaries themselves."""
+        return max((summary['created'] for summary in summaries if summary['created']), default=None)
 
-        return field_dict
+    @staticmethod
+    def get_data_version(created):
+        """Returns an identifier for the summary data last loaded at `created`, that a snapshot was built from."""
+        return created.isoformat() if created else 'empty'
+
+    def get_snapshot_version(self):
+        """
+        Returns the version of the snapshot to serve, from the time the summaries were last loaded as cached by
+        get_max_created, so that new loads are picked up within LAST_MODIFIED_CACHE_TIMEOUT seconds.
+        It is read once per request, so that the response validators and the summaries agree.
+        """
+        if self.snapshot_version is None:
+            self.snapshot_created = get_max_created(self.model.objects.all())
+            self.snapshot_version = self.get_data_version(self.snapshot_created)
+        return self.snapshot_version
+
+    @classmethod
+    def get_snapshot_key(cls, version, batch=None):
+        """Returns the cache key of a batch of summaries, or of the snapshot index if no batch is given."""
+        key = f'{cls.snapshot_key_prefix}:{version}'
+        return key if batch is None else f'{key}:{batch}'
+
+    @classmethod
+    def build_snapshot(cls, version=None):
+        """
+        Aggregates the summaries of all courses, and stores them in the cache under the
+        version of the data that was read. Returns the summaries, ordered by course ID.
+
+        Summaries are cached in batches of BULK_ID_LOOKUP_BATCH_SIZE courses, along with
+        an index that maps each course ID to its batch, so that requests for a few
+        courses only need to load a few batches.
 
-    def add_recent_count_change(self, field_dict):
-        # Pick the most recent daily count on-or-before the desired date
-        # If there are no daily counts before the desired date, assume 0
-        recents = models.CourseEnrollmentDaily.objects.filter(
-            course_id=field_dict['course_id'],
-            date__lte=self.recent_date
-        ).order_by('-date')[0:1]
-        if recents:
-            recent_count = recents[0].count
+        If the data read is not the expected `version`, e.g. when it is built after a load,
+        the cached time the summaries were last loaded is cleared so that requests move on to it.
+        """
+        view = cls()
+        summaries = view.group_by_id(view.get_rows(cls.model.objects.all()))
+        data_version = cls.get_data_version(cls.get_data_created(summaries))
+        batch_size = getattr(settings, 'BULK_ID_LOOKUP_BATCH_SIZE', 500)
+
+        index = {}
+        snapshot = {}
+        for batch, batch_summaries in enumerate(batched(summaries, batch_size)):
+            snapshot[cls.get_snapshot_key(data_version, batch)] = batch_summaries
+            index.update({summary['course_id']: batch for summary in batch_summaries})
+        # The index is stored last, so that it is only found once its batches are stored.
+        cache = cls.get_snapshot_cache()
+        timeout = getattr(settings, 'COURSE_SUMMARIES_SNAPSHOT_TIMEOUT', None)
+        cache.set_many(snapshot, timeout)
+        cache.set(cls.get_snapshot_key(data_version), index, timeout)
+
+        if data_version != version:
+            clear_max_created(cls.model.objects.all())
+        return summaries
+
+    def rebuild_snapshot(self):
+        """
+        Builds the snapshot of the requested version, and returns its summaries. If newer data was
+        loaded since the version was cached, the response is validated by the time it was loaded instead.
+        """
+        summaries = self.build_snapshot(self.get_snapshot_version())
+        created = self.get_data_created(summaries)
+        if created and self.last_modified and created > self.last_modified:
+            self.last_modified = created
+        return summaries
+
+    def get_snapshot_index(self):
+        """Returns the index of the snapshot of the requested version, or None if there is none."""
+        return self.get_snapshot_cache().get(self.get_snapshot_key(self.get_snapshot_version()))
+
+    def get_snapshot_summaries(self):
+        """Returns the requested course summaries from the snapshot, building it if needed."""
+        index = self.get_snapshot_index()
+        if index is not None:
+            if self.ids:
+                batches = sorted({index[course_id] for course_id in set(self.ids) if course_id in index})
+            else:
+                batches = sorted(set(index.values()))
+            keys = [self.get_snapshot_key(self.get_snapshot_version(), batch) for batch in batches]
+            cached_batches = self.get_snapshot_cache().get_many(keys)
+            if len(cached_batches) == len(keys):
+                summaries = [summary for key in keys for summary in cached_batches[key]]
+                return self.filter_summaries(summaries)
+
+        # The snapshot is missing or was partially evicted, so rebuild it.
+        return self.filter_summaries(self.rebuild_snapshot())
+
+    def iter_snapshot_summaries(self):
+        """
+        Yields the summaries of all courses from the snapshot, loading one cached batch
+        at a time, and building the snapshot if needed.
+        """
+        index = self.get_snapshot_index()
+        streamed_ids = set()
+        if index is not None:
+            for batch in sorted(set(index.values())):
+                batch_key = self.get_snapshot_key(self.get_snapshot_version(), batch)
+                batch_summaries = self.get_snapshot_cache().get(batch_key)
+                if batch_summaries is None:
+                    break
+                for summary in batch_summaries:
+                    streamed_ids.add(summary['course_id'])
+                    yield summary
+            else:
+                return
+
+        # The snapshot is missing or was evicted part way through, so rebuild it and carry on.
+        for summary in self.rebuild_snapshot():
+            if summary['course_id'] not in streamed_ids:
+                yield summary
+
+    def filter_summaries(self, summaries):
+        """Returns the summaries of the requested courses."""
+        if self.ids:
+            requested_ids = set(self.ids)
+            summaries = [summary for summary in summaries if summary['course_id'] in requested_ids]
+        return summaries
+
+    @raise_404_if_none
+    def get_queryset(self):
+        if self.snapshot_enabled():
+            summaries = self.get_snapshot_summaries()
         else:
-            recent_count = 0
-        field_dict['recent_count_change'] = field_dict['count'] - recent_count
-        return field_dict
+            summaries = super().get_queryset()
+        return self.postprocess_summaries(summaries, all_courses=not self.ids)
 
-    def add_programs(self, field_dict):
-        """Query for programs attached to a course and include them (just the IDs) in the course summary dict"""
-        field_dict['programs'] = []
-        queryset = self.programs_model.objects.filter(course_id=field_dict['course_id'])
-        for program in queryset:
-            program = self.programs_serializer_class(program.__dict__)
-            field_dict['programs'].append(program.data['program_id'])
-        return field_dict
+    def stream_field_dicts(self):
+        """
+        Yields the summaries of all courses, applying the enrichments to a batch of
+        BULK_ID_LOOKUP_BATCH_SIZE courses at a time.
+        """
+        if self.snapshot_enabled():
+            summaries = self.iter_snapshot_summaries()
+        else:
+            summaries = super().stream_field_dicts()
+        for batch in batched(summaries, getattr(settings, 'BULK_ID_LOOKUP_BATCH_SIZE', 500)):
+            yield from self.postprocess_summaries(batch)
+
+    def postprocess_summaries(self, summaries, all_courses=False):
+        """
+        Applies the request-specific exclusions and enrichments to the aggregated summaries.
+        If `all_courses` is set, the summaries cover every course, so the enrichment queries
+        are not filtered by course.
+        """
+        for summary in summaries:
+            for field in self.exclude:
+                for mode in summary['enrollment_modes']:
+                    _ = summary['enrollment_modes'][mode].pop(field, None)
+
+        # Enrich all of the summaries at once, rather than querying per course.
+        if 'programs' not in self.exclude:
+            # don't do expensive querying for programs if we are just going to throw it away
+            self.add_programs(summaries, all_courses)
+
+        if self.recent_date and 'recent_count_change' not in self.exclude:
+            self.add_recent_count_change(summaries, all_courses)
 
-    def get_query(self):
-        return functools_reduce(lambda q, item_id: q | Q(course_id=item_id), self.ids, Q())
+        return summaries
+
+    @staticmethod
+    def get_course_id_batches(summaries, all_courses=False):
+        """
+        Returns the batches of course IDs to filter enrichment queries by, or a single
+        unfiltered batch (None) when the summaries cover all courses.
+        """
+        if all_courses:
+            return [None]
+        course_ids = [summary['course_id'] for summary in summaries]
+        return batched(course_ids, getattr(settings, 'BULK_ID_LOOKUP_BATCH_SIZE', 500))
+
+    def add_recent_count_change(self, summaries, all_courses=False):
+        """
+        Include the count change since recent_date in each course summary.
+
+        Picks the most recent daily count on-or-before the desired date for every
+        course. If there are no daily counts before the desired date, assume 0.
+        """
+        # The latest date of each course is grouped first, and only those (course, date) rows are fetched, so
+        # neither query correlates a subquery with every row nor crosses the courses with all of their dates.
+        batch_size = getattr(settings, 'BULK_ID_LOOKUP_BATCH_SIZE', 500)
+        latest_dates = {}
+        for course_ids in self.get_course_id_batches(summaries, all_courses):
+            queryset = models.CourseEnrollmentDaily.objects.filter(date__lte=self.recent_date)
+            if course_ids is not None:
+                queryset = queryset.filter(course_id__in=course_ids)
+            latest_dates.update(queryset.order_by().values_list('course_id').annotate(Max('date')))
+
+        recent_counts = {}
+        for batch in batched(sorted(latest_dates.items()), batch_size):
+            query = reduce(or_, (Q(course_id=course_id, date=date) for course_id, date in batch))
+            recent_counts.update(models.CourseEnrollmentDaily.objects.filter(query).values_list('course_id', 'count'))
+
+        for summary in summaries:
+            summary['recent_count_change'] = summary['count'] - recent_counts.get(summary['course_id'], 0)
+
+    def add_programs(self, summaries, all_courses=False):
+        """Query for the programs attached to the courses and include them (just the IDs) in each course summary."""
+        programs = defaultdict(list)
+        for course_ids in self.get_course_id_batches(summaries, all_courses):
+            queryset = self.programs_model.objects.all()
+            if course_ids is not None:
+                queryset = queryset.filter(course_id__in=course_ids)
+            for course_id, program_id in queryset.values_list('course_id', 'program_id'):
+                programs[course_id].append(program_id)
+
+        for summary in summaries:
+            summary['programs'] = programs[summary['course_id']]
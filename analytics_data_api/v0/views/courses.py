@@ -1,11 +1,16 @@
 import datetime
 import warnings
+from collections import OrderedDict
+from hashlib import md5
 from itertools import groupby
+from operator import itemgetter
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import connections
-from django.db.models import Max
+from django.db.models import Case, CharField, Max, Sum, Value, When
+from django.db.models.functions import Trunc
 from django.http import Http404
 from django.utils.timezone import make_aware, utc
 from opaque_keys.edx.keys import CourseKey
@@ -13,15 +18,39 @@ from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from analytics_data_api.constants import enrollment_modes
+from analytics_data_api.constants import enrollment_modes, genders
+from analytics_data_api.constants.country import get_alpha2
 from analytics_data_api.utils import dictfetchall, get_course_report_download_details
 from analytics_data_api.v0 import models, serializers
-from analytics_data_api.v0.exceptions import ReportFileNotFoundError
+from analytics_data_api.v0.exceptions import ParameterValueError, ReportFileNotFoundError
 from analytics_data_api.v0.models import ModuleEngagement
-from analytics_data_api.v0.views.utils import raise_404_if_none
+from analytics_data_api.v0.schema import has_first_last_answer_distribution
+from analytics_data_api.v0.views import ResponseCacheMixin, StreamingListMixin
+from analytics_data_api.v0.views.utils import get_max_created, pivot_counts, raise_404_if_none, split_query_argument
 
 
-class BaseCourseView(generics.ListAPIView):
+def get_latest_activity_interval_ends(course_id):
+    """
+    Returns the end of the most recent interval of each activity type of the course.
+
+    They are computed in a single grouped query, and cached under the time the course's activity was last
+    loaded. That time is itself cached by get_max_created for LAST_MODIFIED_CACHE_TIMEOUT seconds, so most
+    requests query neither, and new activity data is picked up once it expires.
+    """
+    version = get_max_created(models.CourseActivityWeekly.objects.filter(course_id=course_id))
+    if version is None:
+        return {}
+
+    key = 'course_activity_latest_interval_ends:{}'.format(
+        md5('{}|{}'.format(course_id, version.isoformat()).encode('utf-8')).hexdigest())
+    latest_interval_ends = cache.get(key)
+    if latest_interval_ends is None:
+        latest_interval_ends = models.CourseActivityWeekly.get_latest_interval_ends(course_id)
+        cache.set(key, latest_interval_ends)
+    return latest_interval_ends
+
+
+class BaseCourseView(ResponseCacheMixin, generics.ListAPIView):
     start_date = None
     end_date = None
     course_id = None
@@ -39,7 +68,8 @@ class BaseCourseView(generics.ListAPIView):
 
         return super().get(request, *args, **kwargs)
 
-    def parse_date(self, date, timezone):
+    @staticmethod
+    def parse_date(date, timezone):
         if date:
             try:
                 date = datetime.datetime.strptime(date, settings.DATETIME_FORMAT)
@@ -51,6 +81,9 @@ class BaseCourseView(generics.ListAPIView):
     def apply_date_filtering(self, queryset):
         raise NotImplementedError
 
+    def get_last_modified(self):
+        return get_max_created(self.model.objects.filter(course_id=self.course_id))
+
     @raise_404_if_none
     def get_queryset(self):
         queryset = self.model.objects.filter(course_id=self.course_id)
@@ -129,10 +162,10 @@ class CourseActivityWeeklyView(BaseCourseView):
                 queryset = queryset.filter(interval_end__lt=self.end_date)
         else:
             # No date filter supplied, so only return data for the latest date
-            latest_date = queryset.aggregate(Max('interval_end'))
-            if latest_date:
-                latest_date = latest_date['interval_end__max']
-                queryset = queryset.filter(interval_end=latest_date)
+            latest_interval_ends = get_latest_activity_interval_ends(self.course_id)
+            if not latest_interval_ends:
+                return queryset.none()
+            queryset = queryset.filter(interval_end=max(latest_interval_ends.values()))
         return queryset
 
     def get_queryset(self):
@@ -140,7 +173,8 @@ class CourseActivityWeeklyView(BaseCourseView):
         queryset = self.format_data(queryset)
         return queryset
 
-    def _format_activity_type(self, activity_type):
+    @staticmethod
+    def _format_activity_type(activity_type):
         activity_type = activity_type.lower()
 
         # The data pipeline stores "any" as "active"; however, the API should display "any".
@@ -156,8 +190,14 @@ class CourseActivityWeeklyView(BaseCourseView):
         Arguments
             data (iterable) -- Data to be formatted.
         """
-        formatted_data = []
+        return list(self.iter_formatted_data(data))
 
+    @classmethod
+    def iter_formatted_data(cls, data):
+        """
+        Yields the elements of format_data one at a time, so that `data`, sorted by course
+        and date, does not need to be held in memory.
+        """
         for key, group in groupby(data, lambda x: (x.course_id, x.interval_start, x.interval_end)):
             # Iterate over groups and create a single item with all activity types
             item = {
@@ -168,16 +208,14 @@ class CourseActivityWeeklyView(BaseCourseView):
             }
 
             for activity in group:
-                activity_type = self._format_activity_type(activity.activity_type)
+                activity_type = cls._format_activity_type(activity.activity_type)
                 item[activity_type] = activity.count
                 item['created'] = max(activity.created, item['created']) if item['created'] else activity.created
 
-            formatted_data.append(item)
-
-        return formatted_data
+            yield item
 
 
-class CourseActivityMostRecentWeekView(generics.RetrieveAPIView):
+class CourseActivityMostRecentWeekView(ResponseCacheMixin, generics.RetrieveAPIView):
     """
     Get counts of users who performed specific activities at least once during the most recently computed week.
 
@@ -245,6 +283,9 @@ class CourseActivityMostRecentWeekView(generics.RetrieveAPIView):
 
         return activity_type
 
+    def get_last_modified(self):
+        return get_max_created(models.CourseActivityWeekly.objects.filter(course_id=self.kwargs.get('course_id')))
+
     def get_object(self):
         """Select the activity report for the given course and activity type."""
 
@@ -253,14 +294,40 @@ class CourseActivityMostRecentWeekView(generics.RetrieveAPIView):
         course_id = self.kwargs.get('course_id')
         activity_type = self._get_activity_type()
 
+        latest_interval_ends = get_latest_activity_interval_ends(course_id)
+        if activity_type not in latest_interval_ends:
+            raise Http404
+
         try:
-            return models.CourseActivityWeekly.get_most_recent(course_id, activity_type)
+            return models.CourseActivityWeekly.get_most_recent(
+                course_id, activity_type, latest_interval_ends[activity_type])
         except ObjectDoesNotExist:
             raise Http404
 
 
 class BaseCourseEnrollmentView(BaseCourseView):
+    intervals = ('day', 'week', 'month')
+
+    def get_interval(self):
+        interval = self.request.query_params.get('interval', 'day')
+        if interval not in self.intervals:
+            raise ParameterValueError('Invalid interval: {}. Valid intervals are: {}.'.format(
+                interval, ', '.join(self.intervals)))
+        return interval
+
+    def apply_interval(self, queryset, interval):
+        """
+        Returns only the rows of the last date in each interval (week or month).
+
+        Enrollment counts are daily snapshots, so the counts of an interval are those of its last
+        date, rather than the sum over the interval. The intervals are computed by the database.
+        """
+        last_dates = queryset.order_by().annotate(interval_start=Trunc('date', interval)) \
+            .values('interval_start').annotate(last_date=Max('date')).values('last_date')
+        return queryset.filter(date__in=last_dates)
+
     def apply_date_filtering(self, queryset):
+        interval = self.get_interval()
         if self.start_date or self.end_date:
             # Filter by start/end date
             if self.start_date:
@@ -268,6 +335,9 @@ class BaseCourseEnrollmentView(BaseCourseView):
 
             if self.end_date:
                 queryset = queryset.filter(date__lt=self.end_date)
+
+            if interval != 'day':
+                queryset = self.apply_interval(queryset, interval)
         else:
             # No date filter supplied, so only return data for the latest date
             latest_date = queryset.aggregate(Max('date'))
@@ -310,6 +380,9 @@ class CourseEnrollmentByBirthYearView(BaseCourseEnrollmentView):
         start_date -- Date after which enrolled students are counted (inclusive).
 
         end_date -- Date before which enrolled students are counted (exclusive).
+
+        interval -- The interval of the counts returned for the start and end dates: day (default),
+            week or month. The counts of each week or month are those of its last date.
     """
 
     slug = 'enrollment-age'
@@ -352,6 +425,9 @@ class CourseEnrollmentByEducationView(BaseCourseEnrollmentView):
         start_date -- Date after which enrolled students are counted (inclusive).
 
         end_date -- Date before which enrolled students are counted (exclusive).
+
+        interval -- The interval of the counts returned for the start and end dates: day (default),
+            week or month. The counts of each week or month are those of its last date.
     """
     slug = 'enrollment-education'
     serializer_class = serializers.CourseEnrollmentByEducationSerializer
@@ -392,37 +468,25 @@ class CourseEnrollmentByGenderView(BaseCourseEnrollmentView):
         start_date -- Date after which enrolled students are counted (inclusive).
 
         end_date -- Date before which enrolled students are counted (exclusive).
+
+        interval -- The interval of the counts returned for the start and end dates: day (default),
+            week or month. The counts of each week or month are those of its last date.
     """
     slug = 'enrollment-gender'
     serializer_class = serializers.CourseEnrollmentByGenderSerializer
     model = models.CourseEnrollmentByGender
+    columns = genders.ALL
+    # Raw genders (e.g. 'f') are counted in the column of their cleaned gender, and all others as unknown
+    column_indexes = {
+        gender: genders.ALL.index(cleaned_gender)
+        for gender, cleaned_gender in models.CourseEnrollmentByGender.CLEANED_GENDERS.items()
+    }
+    column_indexes[None] = columns.index(genders.UNKNOWN)
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        formatted_data = []
-
-        for key, group in groupby(queryset, lambda x: (x.course_id, x.date)):
-            # Iterate over groups and create a single item with gender data
-            item = {
-                'course_id': key[0],
-                'date': key[1],
-                'created': None,
-                'male': 0,
-                'female': 0,
-                'other': 0,
-                'unknown': 0
-            }
-
-            for enrollment in group:
-                gender = enrollment.cleaned_gender.lower()
-                count = item.get(gender, 0)
-                count += enrollment.count
-                item[gender] = count
-                item['created'] = max(enrollment.created, item['created']) if item['created'] else enrollment.created
-
-            formatted_data.append(item)
-
-        return formatted_data
+        rows = queryset.values_list('course_id', 'date', 'created', 'gender', 'count')
+        return list(pivot_counts(rows, self.columns, self.column_indexes, self.column_indexes[None]))
 
 
 class CourseEnrollmentView(BaseCourseEnrollmentView):
@@ -456,6 +520,9 @@ class CourseEnrollmentView(BaseCourseEnrollmentView):
         start_date -- Date after which enrolled students are counted (inclusive).
 
         end_date -- Date before which enrolled students are counted (exclusive).
+
+        interval -- The interval of the counts returned for the start and end dates: day (default),
+            week or month. The counts of each week or month are those of its last date.
     """
     slug = 'enrollment'
     serializer_class = serializers.CourseEnrollmentDailySerializer
@@ -497,43 +564,23 @@ class CourseEnrollmentModeView(BaseCourseEnrollmentView):
         start_date -- Date after which enrolled students are counted (inclusive).
 
         end_date -- Date before which enrolled students are counted (exclusive).
+
+        interval -- The interval of the counts returned for the start and end dates: day (default),
+            week or month. The counts of each week or month are those of its last date.
     """
 
     slug = 'enrollment_mode'
     serializer_class = serializers.CourseEnrollmentModeDailySerializer
     model = models.CourseEnrollmentModeDaily
+    columns = [mode for mode in enrollment_modes.ALL if mode != enrollment_modes.PROFESSIONAL_NO_ID]
+    # Merge professional with non verified professional
+    column_indexes = {mode: index for index, mode in enumerate(columns)}
+    column_indexes[enrollment_modes.PROFESSIONAL_NO_ID] = column_indexes[enrollment_modes.PROFESSIONAL]
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        formatted_data = []
-
-        for key, group in groupby(queryset, lambda x: (x.course_id, x.date)):
-            item = {
-                'course_id': key[0],
-                'date': key[1],
-                'created': None
-            }
-
-            total = 0
-            cumulative_total = 0
-
-            for enrollment in group:
-                mode = enrollment.mode
-                item[mode] = enrollment.count
-                item['created'] = max(enrollment.created, item['created']) if item['created'] else enrollment.created
-                total += enrollment.count
-                cumulative_total += enrollment.cumulative_count
-
-            # Merge professional with non verified professional
-            item[enrollment_modes.PROFESSIONAL] = \
-                item.get(enrollment_modes.PROFESSIONAL, 0) + item.pop(enrollment_modes.PROFESSIONAL_NO_ID, 0)
-
-            item['count'] = total
-            item['cumulative_count'] = cumulative_total
-
-            formatted_data.append(item)
-
-        return formatted_data
+        rows = queryset.values_list('course_id', 'date', 'created', 'mode', 'count', 'count', 'cumulative_count')
+        return list(pivot_counts(rows, self.columns, self.column_indexes, totals=('count', 'cumulative_count')))
 
 
 # pylint: disable=line-too-long
@@ -578,6 +625,9 @@ class CourseEnrollmentByLocationView(BaseCourseEnrollmentView):
         start_date -- Date after which enrolled students are counted (inclusive).
 
         end_date -- Date before which enrolled students are counted (exclusive).
+
+        interval -- The interval of the counts returned for the start and end dates: day (default),
+            week or month. The counts of each week or month are those of its last date.
     """
 
     slug = 'enrollment-location'
@@ -585,41 +635,142 @@ class CourseEnrollmentByLocationView(BaseCourseEnrollmentView):
     model = models.CourseEnrollmentByCountry
 
     def get_queryset(self):
-        # Get all of the data from the database
         queryset = super().get_queryset()
-        items = queryset.all()
-
-        # Data must be sorted in order for groupby to work properly
-        items = sorted(items, key=lambda x: '' if x.country.alpha2 is None else x.country.alpha2)
-
-        # Items to be returned by this method
-        returned_items = []
-
-        # Group data by date, country, and course ID
-        for key, group in groupby(items, lambda x: (x.date, x.country.alpha2, x.course_id)):
-            count = 0
-            date = key[0]
-            country_code = key[1]
-            course_id = key[2]
-            created = None
-
-            for item in group:
-                created = max(created, item.created) if created else item.created
-                count += item.count
-
-            # pylint: disable=no-value-for-parameter,unexpected-keyword-arg
-            returned_items.append(models.CourseEnrollmentByCountry(
-                course_id=course_id,
-                date=date,
-                country_code=country_code,
-                count=count,
-                created=created
-            ))
+
+        # The same country may be stored under several codes (e.g. US, USA, 840). Map each stored code to the
+        # two-letter code of its country, so the counts can be summed by date and country in the database.
+        codes_by_alpha2 = {}
+        for country_code in queryset.order_by().values_list('country_code', flat=True).distinct():
+            alpha2 = get_alpha2(country_code)
+            if alpha2:
+                codes_by_alpha2.setdefault(alpha2, []).append(country_code)
+
+        # Unknown countries are grouped together, and sorted first
+        country_alpha2 = Value('', output_field=CharField())
+        if codes_by_alpha2:
+            country_alpha2 = Case(
+                *[When(country_code__in=codes, then=Value(alpha2)) for alpha2, codes in codes_by_alpha2.items()],
+                default=Value(''),
+                output_field=CharField()
+            )
+
+        rows = queryset.annotate(country_alpha2=country_alpha2) \
+            .order_by() \
+            .values('date', 'country_alpha2') \
+            .annotate(total_count=Sum('count'), max_created=Max('created')) \
+            .order_by('country_alpha2', 'date')
 
         # Note: We are returning a list, instead of a queryset. This is
         # acceptable since the consuming code simply expects the returned
         # value to be iterable, not necessarily a queryset.
-        return returned_items
+        # pylint: disable=no-value-for-parameter,unexpected-keyword-arg
+        return [
+            models.CourseEnrollmentByCountry(
+                course_id=self.course_id,
+                date=row['date'],
+                country_code=row['country_alpha2'] or None,
+                count=row['total_count'],
+                created=row['max_created']
+            )
+            for row in rows
+        ]
+
+
+class CourseEnrollmentAllView(BaseCourseEnrollmentView):
+    """
+    Get the enrollment counts of a course for several dimensions at once.
+
+    **Example request**
+
+        GET /api/v0/courses/{course_id}/enrollment/all/
+
+        GET /api/v0/courses/{course_id}/enrollment/all/?dimensions=mode,gender
+
+    **Response Values**
+
+        Returns an object with a key for each requested dimension, whose value is
+        the array returned by the corresponding enrollment endpoint:
+
+            * enrollment: The count of enrolled users (see enrollment/).
+            * mode: The counts of users by mode (see enrollment/mode/).
+            * birth_year: The counts of users by birth year (see enrollment/birth_year/).
+            * education: The counts of users by education level (see enrollment/education/).
+            * gender: The counts of users by gender (see enrollment/gender/).
+            * location: The counts of users by location (see enrollment/location/).
+
+        Dimensions without data for the course are returned as empty arrays.
+
+    **Parameters**
+
+        You can specify the dimensions to return, and the start and end dates for
+        which to count enrolled users.
+
+        You specify dates in the format: YYYY-mm-dd; for
+        example, ``2014-12-15``.
+
+        If no start or end dates are specified, the data for the latest day of each
+        dimension is returned.
+
+        dimensions -- The comma-separated dimensions to return. Default is to return all dimensions.
+
+        start_date -- Date after which enrolled students are counted (inclusive).
+
+        end_date -- Date before which enrolled students are counted (exclusive).
+
+        interval -- The interval of the counts returned for the start and end dates: day (default),
+            week or month. The counts of each week or month are those of its last date.
+    """
+    slug = 'enrollment-all'
+    dimension_views = OrderedDict([
+        ('enrollment', CourseEnrollmentView),
+        ('mode', CourseEnrollmentModeView),
+        ('birth_year', CourseEnrollmentByBirthYearView),
+        ('education', CourseEnrollmentByEducationView),
+        ('gender', CourseEnrollmentByGenderView),
+        ('location', CourseEnrollmentByLocationView),
+    ])
+
+    def get_dimensions(self):
+        dimensions = split_query_argument(self.request.query_params.get('dimensions'))
+        if not dimensions:
+            return list(self.dimension_views)
+
+        invalid_dimensions = [dimension for dimension in dimensions if dimension not in self.dimension_views]
+        if invalid_dimensions:
+            raise ParameterValueError('Invalid dimensions: {}. Valid dimensions are: {}.'.format(
+                ', '.join(invalid_dimensions), ', '.join(self.dimension_views)))
+        return dimensions
+
+    def get_dimension_view(self, dimension):
+        """Returns an instance of the dimension's view, set up with the course and dates of this request."""
+        view = self.dimension_views[dimension](
+            request=self.request, args=self.args, kwargs=self.kwargs, format_kwarg=self.format_kwarg
+        )
+        view.course_id = self.course_id
+        view.start_date = self.start_date
+        view.end_date = self.end_date
+        return view
+
+    def get_last_modified(self):
+        created = [
+            get_max_created(view_class.model.objects.filter(course_id=self.course_id))
+            for view_class in self.dimension_views.values()
+        ]
+        return max(filter(None, created), default=None)
+
+    def list(self, request, *args, **kwargs):
+        data = OrderedDict()
+        for dimension in self.get_dimensions():
+            view = self.get_dimension_view(dimension)
+            try:
+                queryset = view.get_queryset()
+            except Http404:
+                queryset = []
+            data[dimension] = view.get_serializer(queryset, many=True).data
+
+        if not any(data.values()):
+            raise Http404
+        return Response(data)
 
 
 # pylint: disable=abstract-method
@@ -639,12 +790,33 @@ class ProblemsListView(BaseCourseView):
             * total_submissions: Total number of submissions.
             * correct_submissions: Total number of *correct* submissions.
             * part_ids: List of problem part IDs.
+
+    **Notes**
+
+        * When PROBLEM_SUBMISSION_AGGREGATES_ENABLED is set, the problems are read from the aggregates
+          built by the build_problem_submission_aggregates management command, which must be run after
+          each pipeline load, rather than aggregated from the answer distribution on each request.
     """
     serializer_class = serializers.ProblemSerializer
     allow_empty = False
 
+    @staticmethod
+    def use_aggregates():
+        return getattr(settings, 'PROBLEM_SUBMISSION_AGGREGATES_ENABLED', False)
+
+    def get_last_modified(self):
+        model = models.ProblemSubmissionAggregate if self.use_aggregates() else models.ProblemResponseAnswerDistribution
+        return get_max_created(model.objects.filter(course_id=self.course_id))
+
     @raise_404_if_none
     def get_queryset(self):
+        if self.use_aggregates():
+            rows = list(models.ProblemSubmissionAggregate.objects.filter(course_id=self.course_id).values(
+                'module_id', 'total_submissions', 'correct_submissions', 'part_ids', 'created'))
+            for row in rows:
+                row['part_ids'] = row['part_ids'].split(',')
+            return rows
+
         # last_response_count is the number of submissions for the problem part and must
         # be divided by the number of problem parts to get the problem submission rather
         # than the problem *part* submissions
@@ -668,14 +840,7 @@ GROUP BY module_id;
                 # http://code.openark.org/blog/mysql/those-oversized-undersized-variables-defaults.
                 cursor.execute("SET @@group_concat_max_len = @@max_allowed_packet;")
 
-                cursor.execute("DESCRIBE answer_distribution;")
-                column_names = [row[0] for row in cursor.fetchall()]
-            # Alternate query for sqlite test database
-            else:
-                cursor.execute("PRAGMA table_info(answer_distribution)")
-                column_names = [row[1] for row in cursor.fetchall()]
-
-            if 'last_response_count' in column_names:
+            if has_first_last_answer_distribution():
                 cursor.execute(aggregation_query, [self.course_id])
             else:
                 cursor.execute(aggregation_query.replace('last_response_count', 'count'), [self.course_id])
@@ -722,31 +887,140 @@ class ProblemsAndTagsListView(BaseCourseView):
 
     @raise_404_if_none
     def get_queryset(self):
+        # Sorted by problem and tag, so that the values of each tag are appended in order
+        rows = self.model.objects.filter(course_id=self.course_id) \
+            .order_by('module_id', 'tag_name', 'tag_value') \
+            .values_list('module_id', 'total_submissions', 'correct_submissions', 'tag_name', 'tag_value', 'created')
+
+        result = []
+
+        for module_id, module_rows in groupby(rows.iterator(), itemgetter(0)):
+            _, total_submissions, correct_submissions, tag_name, tag_value, created = next(module_rows)
+            problem = {
+                'module_id': module_id,
+                'total_submissions': total_submissions,
+                'correct_submissions': correct_submissions,
+                'tags': {
+                    tag_name: [tag_value]
+                },
+                'created': created
+            }
+
+            for _, _, _, tag_name, tag_value, created in module_rows:
+                problem['tags'].setdefault(tag_name, []).append(tag_value)
+                problem['created'] = max(problem['created'], created)
+
+            result.append(problem)
+
+        return result
+
+
+class BaseCourseModuleDistributionView(StreamingListMixin, BaseCourseView):
+    """
+    Base view for the distributions of all the modules of a course, optionally filtered by module.
+
+    The rows are read from a single scan of the course's index, ordered so that those of each module
+    are grouped together, and streamed as they are read when STREAM_UNFILTERED_LIST_RESPONSES is set.
+    """
+    allow_empty = False
+    ordering = ('module_id',)
+    module_ids = None
+
+    def get(self, request, *args, **kwargs):
+        self.module_ids = split_query_argument(request.query_params.get('module_ids'))
+        return super().get(request, *args, **kwargs)
+
+    def get_rows(self):
         queryset = self.model.objects.filter(course_id=self.course_id)
-        items = queryset.all()
-
-        result = {}
-
-        for v in items:
-            if v.module_id in result:
-                if v.tag_name not in result[v.module_id]['tags']:
-                    result[v.module_id]['tags'][v.tag_name] = []
-                result[v.module_id]['tags'][v.tag_name].append(v.tag_value)
-                result[v.module_id]['tags'][v.tag_name].sort()
-                if result[v.module_id]['created'] < v.created:
-                    result[v.module_id]['created'] = v.created
-            else:
-                result[v.module_id] = {
-                    'module_id': v.module_id,
-                    'total_submissions': v.total_submissions,
-                    'correct_submissions': v.correct_submissions,
-                    'tags': {
-                        v.tag_name: [v.tag_value]
-                    },
-                    'created': v.created
-                }
+        if self.module_ids:
+            queryset = queryset.filter(module_id__in=self.module_ids)
+        return queryset.order_by(*self.ordering)
 
-        return list(result.values())
+    @raise_404_if_none
+    def get_queryset(self):
+        return self.get_rows()
+
+    def list(self, request, *args, **kwargs):
+        renderer_class = self.get_streaming_renderer_class(request)
+        if renderer_class is None:
+            return super().list(request, *args, **kwargs)
+
+        # Like get_queryset, a course or modules without rows are a 404 rather than an empty list: the first
+        # row is read before responding (see get_streaming_results_response), so no separate exists() is needed.
+        return self.get_streaming_response(renderer_class, self.get_rows().iterator())
+
+
+class CourseGradeDistributionView(BaseCourseModuleDistributionView):
+    """
+    Get the grade distribution of every problem in a course.
+
+    **Example request**
+
+        GET /api/v0/courses/{course_id}/grade_distribution/
+
+        GET /api/v0/courses/{course_id}/grade_distribution/?module_ids={module_id_1},{module_id_2}
+
+    **Response Values**
+
+        Returns the same collection as GET /api/v0/problems/{module_id}/grade_distribution/, for
+        all the problems of the course, ordered by problem and grade. Each item contains:
+
+            * module_id: The ID of the problem.
+            * course_id: The ID of the course.
+            * grade: The grade.
+            * max_grade: The maximum possible grade.
+            * count: The number of learners who got the grade.
+            * created: The date the count was computed.
+
+    **Parameters**
+
+        module_ids -- The comma-separated IDs of the problems to return. Default is to return
+            all the problems of the course.
+
+    **Notes**
+
+        * The rows are read with the (course_id, module_id, grade) index of the grade_distribution
+          table, which the API does not create: it must be added in the pipeline's schema.
+    """
+    serializer_class = serializers.GradeDistributionSerializer
+    model = models.GradeDistribution
+    slug = 'grade_distribution'
+    ordering = ('module_id', 'grade')
+
+
+class CourseSequentialOpenDistributionView(BaseCourseModuleDistributionView):
+    """
+    Get the number of views of every subsection in a course.
+
+    **Example request**
+
+        GET /api/v0/courses/{course_id}/sequential_open_distribution/
+
+        GET /api/v0/courses/{course_id}/sequential_open_distribution/?module_ids={module_id_1},{module_id_2}
+
+    **Response Values**
+
+        Returns the same collection as GET /api/v0/problems/{module_id}/sequential_open_distribution/,
+        for all the subsections of the course, ordered by subsection. Each item contains:
+
+            * module_id: The ID of the subsection.
+            * course_id: The ID of the course.
+            * count: The number of times the subsection was viewed.
+            * created: The date the count was computed.
+
+    **Parameters**
+
+        module_ids -- The comma-separated IDs of the subsections to return. Default is to return
+            all the subsections of the course.
+
+    **Notes**
+
+        * The rows are read with the (course_id, module_id) index of the sequential_open_distribution
+          table, which the API does not create: it must be added in the pipeline's schema.
+    """
+    serializer_class = serializers.SequentialOpenDistributionSerializer
+    model = models.SequentialOpenDistribution
+    slug = 'sequential_open_distribution'
 
 
 class VideosListView(BaseCourseView):
@@ -854,6 +1128,9 @@ class UserEngagementView(BaseCourseView):
         self.username = self.kwargs.get('username')
         return super().get(request, *args, **kwargs)
 
+    def get_last_modified(self):
+        return get_max_created(ModuleEngagement.objects.filter(course_id=self.course_id))
+
     @raise_404_if_none
     def get_queryset(self):
         queryset = ModuleEngagement.objects.get_aggregate_engagement_data(self.course_id)
@@ -3,12 +3,21 @@ API methods for module level data.
 """
 
 
+import datetime
 import logging
+import threading
+import time
+from hashlib import md5
 
 from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.http import StreamingHttpResponse
+from django.utils.timezone import is_naive, make_aware, utc
+from elasticsearch_dsl.connections import connections
 from enterprise_data.models import EnterpriseUser
 from rest_framework import generics, status
 
+from analytics_data_api.renderers import StreamingDynamicFieldsCsvRenderer
 from analytics_data_api.v0.exceptions import (
     LearnerEngagementTimelineNotFoundError,
     LearnerNotFoundError,
@@ -17,33 +26,152 @@ from analytics_data_api.v0.exceptions import (
 from analytics_data_api.v0.models import ModuleEngagement, ModuleEngagementMetricRanges, RosterEntry, RosterUpdate
 from analytics_data_api.v0.serializers import (
     CourseLearnerMetadataSerializer,
+    EdxCursorPaginationSerializer,
     EdxPaginationSerializer,
     EngagementDaySerializer,
     EnterpriseLearnerEngagementSerializer,
     LastUpdatedSerializer,
     LearnerSerializer,
 )
-from analytics_data_api.v0.views import CourseViewMixin, CsvViewMixin, PaginatedHeadersMixin
-from analytics_data_api.v0.views.utils import split_query_argument
+from analytics_data_api.v0.views import CourseViewMixin, CsvViewMixin, PaginatedHeadersMixin, ResponseCacheMixin
+from analytics_data_api.v0.views.utils import get_max_created, split_query_argument
 
 logger = logging.getLogger(__name__)
 
 
+ROSTER_LAST_UPDATED_CACHE_KEY = 'roster_last_updated'
+
+_roster_last_updated = {}
+_roster_last_updated_lock = threading.Lock()
+
+
+def get_roster_last_updated_cache():
+    return caches[getattr(settings, 'ROSTER_LAST_UPDATED_CACHE_ALIAS', DEFAULT_CACHE_ALIAS)]
+
+
+def clear_roster_last_updated_cache():
+    """ Forgets the cached RosterUpdate marker, e.g. after the learner roster has been reloaded. """
+    _roster_last_updated.clear()
+    get_roster_last_updated_cache().delete(ROSTER_LAST_UPDATED_CACHE_KEY)
+
+
+def get_roster_last_updated():
+    """
+    Returns the date of the RosterUpdate marker of the learner roster, or None if there is none.
+
+    The marker changes about once a day, so it is cached for ROSTER_LAST_UPDATED_CACHE_TIMEOUT seconds in
+    this process, and in the ROSTER_LAST_UPDATED_CACHE_ALIAS cache. That cache is only shared between the
+    workers if its backend is (e.g. memcached); the default LocMemCache is per process. Since a process may
+    keep a value it read from the cache just before it expired, the marker can be up to twice the timeout
+    out of date. Only one thread of a process reads it at a time, and the others use its result.
+    """
+    timeout = getattr(settings, 'ROSTER_LAST_UPDATED_CACHE_TIMEOUT', 60)
+
+    def get_fresh_entry():
+        entry = _roster_last_updated.get('entry')
+        if entry is not None and time.monotonic() - entry[0] < timeout:
+            return entry
+        return None
+
+    entry = get_fresh_entry()
+    if entry is None:
+        with _roster_last_updated_lock:
+            entry = get_fresh_entry()
+            if entry is None:
+                # The date is cached in a tuple, so that a missing marker is cached as well.
+                shared_cache = get_roster_last_updated_cache()
+                cached = shared_cache.get(ROSTER_LAST_UPDATED_CACHE_KEY)
+                if cached is None:
+                    roster_update = RosterUpdate.get_last_updated()
+                    if len(roster_update) >= 1:
+                        cached = (roster_update[0].date,)
+                    else:
+                        logger.warning('RosterUpdate not found.')
+                        cached = (None,)
+                    shared_cache.set(ROSTER_LAST_UPDATED_CACHE_KEY, cached, timeout)
+                entry = (time.monotonic(), cached[0])
+                _roster_last_updated['entry'] = entry
+    return entry[1]
+
+
+def get_course_learner_metadata(course_id, version):
+    """
+    Returns the number of learners of the course by cohort, segment and enrollment mode, as returned by
+    RosterEntry.get_course_metadata.
+
+    They are cached under the given roster version (the date of the RosterUpdate marker), so they are
+    only aggregated again once the learner roster has been updated.
+    """
+    if version is None:
+        return RosterEntry.get_course_metadata(course_id)
+
+    key = 'course_learner_metadata:{}'.format(
+        md5('{}|{}'.format(course_id, version.isoformat()).encode('utf-8')).hexdigest())
+    metadata = cache.get(key)
+    if metadata is None:
+        metadata = RosterEntry.get_course_metadata(course_id)
+        cache.set(key, metadata)
+    return metadata
+
+
 class LastUpdateMixin:
 
     @classmethod
     def get_last_updated(cls):
         """ Returns the serialized RosterUpdate last_updated field. """
-        roster_update = RosterUpdate.get_last_updated()
-        last_updated = {'date': None}
-        if len(roster_update) >= 1:
-            last_updated = roster_update[0]
-        else:
-            logger.warning('RosterUpdate not found.')
-        return LastUpdatedSerializer(last_updated).data
+        return LastUpdatedSerializer({'date': get_roster_last_updated()}).data
 
+    @classmethod
+    def get_roster_last_modified(cls):
+        """ Returns the time the learner roster was last updated, from the RosterUpdate marker, or None. """
+        date = get_roster_last_updated()
+        if not date:
+            return None
+        if not isinstance(date, datetime.datetime):
+            date = datetime.datetime.combine(date, datetime.time.min)
+        return make_aware(date, utc) if is_naive(date) else date
+
+    def get_last_modified(self):
+        return self.get_roster_last_modified()
+
+    def get_serializer_context(self):
+        """ Passes the last_updated field, which is the same for all the learners, to the serializer. """
+        context = super().get_serializer_context()
+        context.update(self.get_last_updated())
+        return context
+
+
+class LearnerFieldsMixin:
+    """
+    Serializes only the learner fields given by the `fields` and/or `exclude` parameters, and reads
+    only the fields of the roster entries they need from Elasticsearch.
+    """
 
-class LearnerView(LastUpdateMixin, CourseViewMixin, generics.RetrieveAPIView):
+    def get_serializer_fields(self):
+        """ Returns the `fields` and `exclude` arguments of the serializer, each None if not given. """
+        fields = split_query_argument(self.request.query_params.get('fields'))
+        exclude = split_query_argument(self.request.query_params.get('exclude'))
+        # The fields nested in the CSV columns (e.g. engagements.videos_viewed) are serialized whole.
+        if fields is not None:
+            fields = [field.split('.')[0] for field in fields]
+        if exclude is not None:
+            exclude = [field for field in exclude if '.' not in field]
+        return fields, exclude
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'], kwargs['exclude'] = self.get_serializer_fields()
+        return super().get_serializer(*args, **kwargs)
+
+    def get_source_fields(self):
+        """ Returns the fields of the roster entries to read, or None to read them all. """
+        fields, exclude = self.get_serializer_fields()
+        if fields is None and exclude is None:
+            return None
+        return LearnerSerializer.get_source_fields(fields, exclude)
+
+
+class LearnerView(LearnerFieldsMixin, LastUpdateMixin, CourseViewMixin, ResponseCacheMixin,
+                  generics.RetrieveAPIView):
     """
     Get data for a particular learner in a particular course.
 
@@ -91,6 +219,8 @@ class LearnerView(LastUpdateMixin, CourseViewMixin, generics.RetrieveAPIView):
 
         course_id -- The course identifier for which user data is requested.
         For example, edX/DemoX/Demo_Course.
+        fields -- The comma-separated fields to return. Defaults to all the fields.
+        exclude -- The comma-separated fields to not return.
 
     """
     serializer_class = LearnerSerializer
@@ -101,16 +231,8 @@ class LearnerView(LastUpdateMixin, CourseViewMixin, generics.RetrieveAPIView):
         self.username = self.kwargs.get('username')
         return super().get(request, *args, **kwargs)
 
-    def retrieve(self, request, *args, **kwargs):
-        """
-        Adds the last_updated field to the result.
-        """
-        response = super().retrieve(request, args, kwargs)
-        response.data.update(self.get_last_updated())
-        return response
-
     def get_queryset(self):
-        return RosterEntry.get_course_user(self.course_id, self.username)
+        return RosterEntry.get_course_user(self.course_id, self.username, source_fields=self.get_source_fields())
 
     def get_object(self):
         queryset = self.get_queryset()
@@ -119,7 +241,8 @@ class LearnerView(LastUpdateMixin, CourseViewMixin, generics.RetrieveAPIView):
         raise LearnerNotFoundError(username=self.username, course_id=self.course_id)
 
 
-class LearnerListView(LastUpdateMixin, CourseViewMixin, PaginatedHeadersMixin, CsvViewMixin, generics.ListAPIView):
+class LearnerListView(LearnerFieldsMixin, LastUpdateMixin, CourseViewMixin, ResponseCacheMixin,
+                      PaginatedHeadersMixin, CsvViewMixin, generics.ListAPIView):
     """
     Get a paginated list of data for all learners in a course.
 
@@ -220,6 +343,10 @@ class LearnerListView(LastUpdateMixin, CourseViewMixin, PaginatedHeadersMixin, C
         course_id -- The course identifier for which user data is requested.
             For example, edX/DemoX/Demo_Course.
         page -- The page of results that should be returned.
+        cursor -- Pages by cursor rather than by page number when given: empty
+            for the first page, then the cursor of the "next" link of the
+            previous page. Every page then takes the same time however deep
+            it is, but only the "next" link is returned, without the count.
         page_size -- The maximum number of results to return per page.
         text_search -- An alphanumeric string that is used to search name,
             username, and email address values to find learners.
@@ -238,24 +365,53 @@ class LearnerListView(LastUpdateMixin, CourseViewMixin, PaginatedHeadersMixin, C
         order_by -- The field for sorting the response. Defaults to 'username'.
         sort_order -- The sort direction.  One of 'asc' (ascending) or 'desc'
             (descending). Defaults to 'asc'.
-        fields -- The list of fields, and their sort order, to return when
+        fields -- The list of fields to return, and their sort order when
             viewing CSV data.  Defaults to the full list of available fields,
-            in alphabetical order.
+            in alphabetical order for CSV data.
+        exclude -- The list of fields to not return.
+        export -- When 'true' and CSV is requested, all the learners are
+            streamed in a single response rather than a page of them.
     """
     serializer_class = LearnerSerializer
-    pagination_class = EdxPaginationSerializer
+    pagination_class = EdxCursorPaginationSerializer
     filename_slug = 'learners'
 
     def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format == 'csv' and request.query_params.get('export') == 'true':
+            return self.export()
+        return super().list(request, args, kwargs)
+
+    def export(self):
         """
-        Adds the last_updated field to the results.
+        Streams all the learners as CSV rows, scrolling through the search in batches, so that they
+        are not all held in memory and the search is only set up once. The scroll is cleared once the
+        export ends, or is abandoned, rather than held until it expires.
         """
-        response = super().list(request, args, kwargs)
-        last_updated = self.get_last_updated()
-        if response.data['results'] is not None:
-            for result in response.data['results']:
-                result.update(last_updated)
-        return response
+        batch_size = getattr(settings, 'ELASTICSEARCH_LEARNERS_EXPORT_BATCH_SIZE', 1000)
+        scroll = getattr(settings, 'ELASTICSEARCH_LEARNERS_EXPORT_SCROLL', '1m')
+        search = self.get_queryset().params(size=batch_size, scroll=scroll)
+
+        def iter_learners():
+            es = connections.get_connection()
+            response = search.execute()
+            scroll_id = getattr(response, '_scroll_id', None)
+            learners = list(response.hits)
+            try:
+                while learners:
+                    yield from self.get_serializer(learners, many=True).data
+                    response = es.scroll(scroll_id=scroll_id, scroll=scroll)
+                    scroll_id = response.get('_scroll_id', scroll_id)
+                    learners = [RosterEntry.from_es(hit) for hit in response['hits']['hits']]
+            finally:
+                if scroll_id is not None:
+                    # The scroll may already have expired
+                    es.clear_scroll(scroll_id=scroll_id, ignore=404)
+
+        renderer = StreamingDynamicFieldsCsvRenderer()
+        return StreamingHttpResponse(
+            renderer.render(iter_learners(), renderer_context=self.get_renderer_context()),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
 
     def get_queryset(self):
         """
@@ -287,6 +443,7 @@ class LearnerListView(LastUpdateMixin, CourseViewMixin, PaginatedHeadersMixin, C
             'enrollment_mode': query_params.get('enrollment_mode'),
             'text_search': query_params.get('text_search'),
             'sort_policies': sort_policies,
+            'source_fields': self.get_source_fields(),
         }
         # Remove None values from `params` so that we don't overwrite default
         # parameter values in `get_users_in_course`.
@@ -297,7 +454,7 @@ class LearnerListView(LastUpdateMixin, CourseViewMixin, PaginatedHeadersMixin, C
             raise ParameterValueError(str(err))
 
 
-class EngagementTimelineView(CourseViewMixin, generics.ListAPIView):
+class EngagementTimelineView(CourseViewMixin, ResponseCacheMixin, generics.ListAPIView):
     """
     Get a particular learner's engagement timeline for a particular course.
     Days without data are not returned.
@@ -347,6 +504,9 @@ class EngagementTimelineView(CourseViewMixin, generics.ListAPIView):
         self.username = self.kwargs.get('username')
         return super().get(request, *args, **kwargs)
 
+    def get_last_modified(self):
+        return get_max_created(ModuleEngagement.objects.filter(course_id=self.course_id, username=self.username))
+
     def get_queryset(self):
         queryset = ModuleEngagement.objects.get_timeline(self.course_id, self.username)
         if len(queryset) == 0:
@@ -374,7 +534,7 @@ class EnterpriseLearnerEngagementView(generics.ListAPIView):
         ).order_by('id')
 
 
-class CourseLearnerMetadata(CourseViewMixin, generics.RetrieveAPIView):
+class CourseLearnerMetadata(LastUpdateMixin, CourseViewMixin, ResponseCacheMixin, generics.RetrieveAPIView):
     """
     Get metadata about the learners in a course. Includes data on segments,
     cohorts, and enrollment modes. Also includes an engagement rubric.
@@ -416,11 +576,18 @@ class CourseLearnerMetadata(CourseViewMixin, generics.RetrieveAPIView):
     """
     serializer_class = CourseLearnerMetadataSerializer
 
+    def get_last_modified(self):
+        created = [
+            self.get_roster_last_modified(),
+            get_max_created(ModuleEngagementMetricRanges.objects.filter(course_id=self.course_id)),
+        ]
+        return max(filter(None, created), default=None)
+
     def get_object(self):
         # Because we're serializing data from both Elasticsearch and MySQL into
         # the same JSON object, we have to pass both sources of data in a dict
         # to our custom course metadata serializer.
         return {
-            'es_data': RosterEntry.get_course_metadata(self.course_id),
+            'es_data': get_course_learner_metadata(self.course_id, get_roster_last_updated()),
             'engagement_ranges': ModuleEngagementMetricRanges.objects.filter(course_id=self.course_id)
         }
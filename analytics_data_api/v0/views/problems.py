@@ -2,29 +2,36 @@
 API methods for module level data.
 """
 
-from collections import defaultdict
 from itertools import groupby
+from operator import itemgetter
 
-from django.db import OperationalError
+from django.conf import settings
+from django.http import Http404
 from rest_framework import generics
+from rest_framework.response import Response
 
+from analytics_data_api.renderers import StreamingJSONObjectRenderer
 from analytics_data_api.utils import matching_tuple
+from analytics_data_api.v0.exceptions import ParameterValueError
 from analytics_data_api.v0.models import (
     GradeDistribution,
     ProblemFirstLastResponseAnswerDistribution,
     ProblemResponseAnswerDistribution,
     SequentialOpenDistribution,
 )
+from analytics_data_api.v0.schema import has_first_last_answer_distribution
 from analytics_data_api.v0.serializers import (
     ConsolidatedAnswerDistributionSerializer,
     ConsolidatedFirstLastAnswerDistributionSerializer,
     GradeDistributionSerializer,
     SequentialOpenDistributionSerializer,
+    represent_answer_distributions,
 )
-from analytics_data_api.v0.views.utils import raise_404_if_none
+from analytics_data_api.v0.views import ResponseCacheMixin, StreamingListMixin
+from analytics_data_api.v0.views.utils import batched, get_max_created, raise_404_if_none, split_query_argument
 
 
-class ProblemResponseAnswerDistributionView(generics.ListAPIView):
+class ProblemResponseAnswerDistributionView(ResponseCacheMixin, generics.ListAPIView):
     """
     Get the distribution of student answers to a specific problem.
 
@@ -57,69 +64,171 @@ class ProblemResponseAnswerDistributionView(generics.ListAPIView):
     serializer_class = ConsolidatedAnswerDistributionSerializer
     allow_empty = False
 
-    @classmethod
-    def consolidate_answers(cls, problem):
-        """ Attempt to consolidate erroneously randomized answers. """
-        answer_sets = defaultdict(list)
-        match_tuple_sets = defaultdict(set)
+    @staticmethod
+    def consolidate_answers(problem, count_fields):
+        """
+        Attempt to consolidate erroneously randomized answers.
 
-        for answer in problem:
-            answer.consolidated_variant = False
-            answer_sets[answer.value_id].append(answer)
-            match_tuple_sets[answer.value_id].add(matching_tuple(answer))
+        `problem` is the list of the answers to a part, read with values(). The answers with the same
+        value_id are merged into the first of them, summing their `count_fields`, unless their matching
+        fields differ, in which case none of the part's answers are consolidated.
+        """
+        # The (consolidated) answer and the matching tuple of each value_id, in order of appearance
+        value_answers = {}
+        value_matching_tuples = {}
 
-        # If a part has more than one unique tuple of matching fields, do not consolidate.
-        for _, match_tuple_set in match_tuple_sets.items():
-            if len(match_tuple_set) > 1:
+        for answer in problem:
+            value_id = answer['value_id']
+            if value_id not in value_answers:
+                value_answers[value_id] = answer
+                value_matching_tuples[value_id] = matching_tuple(answer)
+            elif value_matching_tuples[value_id] != matching_tuple(answer):
+                # If a part has more than one unique tuple of matching fields, do not consolidate.
                 return problem
+            else:
+                consolidated_answer = value_answers[value_id]
+                if 'consolidated_variant' not in consolidated_answer:
+                    # Copied, so that the part's answers are left untouched if it is not consolidated after all
+                    consolidated_answer = value_answers[value_id] = dict(
+                        consolidated_answer, variant=None, consolidated_variant=True)
+                for field in count_fields:
+                    consolidated_answer[field] += answer[field]
+
+        return list(value_answers.values())
+
+    @staticmethod
+    def get_answer_distribution_model():
+        if has_first_last_answer_distribution():
+            return ProblemFirstLastResponseAnswerDistribution
+        return ProblemResponseAnswerDistribution
+
+    def get_serializer_class(self):
+        if has_first_last_answer_distribution():
+            return ConsolidatedFirstLastAnswerDistributionSerializer
+        return super().get_serializer_class()
+
+    @staticmethod
+    def get_count_fields():
+        if has_first_last_answer_distribution():
+            return ('first_response_count', 'last_response_count')
+        return ('count',)
+
+    def get_answers(self, queryset):
+        """Returns the values of the fields of the answers of `queryset` that are serialized."""
+        fields = [field for field in self.get_serializer_class().Meta.fields if field != 'consolidated_variant']
+        return queryset.values(*fields)
+
+    def consolidate_parts(self, answers):
+        """Yields the consolidated answers of `answers`, which are sorted by problem and part."""
+        count_fields = self.get_count_fields()
+        for _, part in groupby(answers, itemgetter('module_id', 'part_id')):
+            yield from self.consolidate_answers(list(part), count_fields)
+
+    def get_last_modified(self):
+        model = self.get_answer_distribution_model()
+        return get_max_created(model.objects.filter(module_id=self.kwargs.get('problem_id')))
 
-        consolidated_answers = []
+    @raise_404_if_none
+    def get_queryset(self):
+        """Select all the answer distribution response having to do with this usage of the problem."""
+        problem_id = self.kwargs.get('problem_id')
 
-        for _, answers in answer_sets.items():
-            consolidated_answer = None
+        model = self.get_answer_distribution_model()
+        answers = self.get_answers(model.objects.filter(module_id=problem_id).order_by('part_id'))
+        return list(self.consolidate_parts(answers))
 
-            if len(answers) == 1:
-                consolidated_answers.append(answers[0])
-                continue
+    def list(self, request, *args, **kwargs):
+        return Response(represent_answer_distributions(self.get_queryset(), self.get_serializer_class()))
 
-            for answer in answers:
-                if consolidated_answer:
-                    if isinstance(consolidated_answer, ProblemResponseAnswerDistribution):
-                        consolidated_answer.count += answer.count
-                    else:
-                        consolidated_answer.first_response_count += answer.first_response_count
-                        consolidated_answer.last_response_count += answer.last_response_count
-                else:
-                    consolidated_answer = answer
 
-                    consolidated_answer.variant = None
-                    consolidated_answer.consolidated_variant = True
+class ProblemsAnswerDistributionView(StreamingListMixin, ProblemResponseAnswerDistributionView):
+    """
+    Get the distributions of student answers to many problems at once.
 
-            consolidated_answers.append(consolidated_answer)
+    **Example requests**
 
-        return consolidated_answers
+        GET /api/v0/problems/answer_distribution/?problem_ids={problem_id_1},{problem_id_2}
 
-    @raise_404_if_none
-    def get_queryset(self):
-        """Select all the answer distribution response having to do with this usage of the problem."""
-        problem_id = self.kwargs.get('problem_id')
+        POST /api/v0/problems/answer_distribution/
+        {
+            "problem_ids": [
+                "{problem_id_1}",
+                "{problem_id_2}",
+                ...
+            ]
+        }
 
-        try:
-            queryset = list(ProblemResponseAnswerDistribution.objects.filter(module_id=problem_id).order_by('part_id'))
-        except OperationalError:
-            self.serializer_class = ConsolidatedFirstLastAnswerDistributionSerializer
-            queryset = list(ProblemFirstLastResponseAnswerDistribution.objects.filter(
-                module_id=problem_id).order_by('part_id'))
+    **Response Values**
 
-        consolidated_rows = []
+        Returns a dictionary that maps the ID of each problem to its answer distribution, as
+        returned by GET /api/v0/problems/{problem_id}/answer_distribution. Problems without
+        answers are left out.
 
-        for _, part in groupby(queryset, lambda x: x.part_id):
-            consolidated_rows += self.consolidate_answers(list(part))
+    **Parameters**
 
-        return consolidated_rows
+        problem_ids -- The comma-separated IDs of the problems (for GET), or their list (for POST).
 
+    **Notes**
 
-class GradeDistributionView(generics.ListAPIView):
+        * POST is required when the number of problem IDs would cause the URL to be too long.
+        * POST functions the same as GET for this endpoint. It does not modify any state.
+        * The answers are read with one query per batch of BULK_ID_LOOKUP_BATCH_SIZE problems,
+          and consolidated one problem part at a time.
+        * When STREAM_UNFILTERED_LIST_RESPONSES is set, the JSON response is streamed one problem
+          at a time, rather than built in memory.
+    """
+    streaming_renderer_classes = {
+        'json': StreamingJSONObjectRenderer,
+    }
+    problem_ids = None
+
+    def get(self, request, *args, **kwargs):
+        self.problem_ids = split_query_argument(request.query_params.get('problem_ids'))
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        # Converted to a normal dict, so that a single problem ID is still a list.
+        self.problem_ids = dict(request.data).get('problem_ids')
+        return super().get(request, *args, **kwargs)
+
+    def get_problem_id_batches(self):
+        if not self.problem_ids:
+            raise ParameterValueError('problem_ids must be specified.')
+        return batched(sorted(set(self.problem_ids)), getattr(settings, 'BULK_ID_LOOKUP_BATCH_SIZE', 500))
+
+    def get_last_modified(self):
+        model = self.get_answer_distribution_model()
+        created = [
+            get_max_created(model.objects.filter(module_id__in=id_batch))
+            for id_batch in self.get_problem_id_batches()
+        ]
+        return max(filter(None, created), default=None)
+
+    def iter_answer_distributions(self):
+        """
+        Yields the ID and serialized answer distribution of each requested problem, one problem at a time.
+        The batches of IDs are sorted and their answers ordered by problem, so each problem is yielded once.
+        """
+        model = self.get_answer_distribution_model()
+        serializer_class = self.get_serializer_class()
+        for id_batch in self.get_problem_id_batches():
+            answers = self.get_answers(model.objects.filter(module_id__in=id_batch).order_by('module_id', 'part_id'))
+            for module_id, problem_answers in groupby(self.consolidate_parts(answers.iterator()),
+                                                      itemgetter('module_id')):
+                yield module_id, represent_answer_distributions(problem_answers, serializer_class)
+
+    def list(self, request, *args, **kwargs):
+        renderer_class = self.get_streaming_renderer_class(request)
+        if renderer_class is not None:
+            return self.get_streaming_results_response(renderer_class, self.iter_answer_distributions())
+
+        distributions = dict(self.iter_answer_distributions())
+        if not distributions:
+            raise Http404
+        return Response(distributions)
+
+
+class GradeDistributionView(ResponseCacheMixin, generics.ListAPIView):
     """
     Get the distribution of grades for a specific problem.
 
@@ -144,6 +253,9 @@ class GradeDistributionView(generics.ListAPIView):
     serializer_class = GradeDistributionSerializer
     allow_empty = False
 
+    def get_last_modified(self):
+        return get_max_created(GradeDistribution.objects.filter(module_id=self.kwargs.get('problem_id')))
+
     @raise_404_if_none
     def get_queryset(self):
         """Select all grade distributions for a particular module"""
@@ -151,7 +263,7 @@ class GradeDistributionView(generics.ListAPIView):
         return GradeDistribution.objects.filter(module_id=problem_id)
 
 
-class SequentialOpenDistributionView(generics.ListAPIView):
+class SequentialOpenDistributionView(ResponseCacheMixin, generics.ListAPIView):
     """
     Get the number of views of a subsection, or sequential, in the course.
 
@@ -173,6 +285,9 @@ class SequentialOpenDistributionView(generics.ListAPIView):
     serializer_class = SequentialOpenDistributionSerializer
     allow_empty = False
 
+    def get_last_modified(self):
+        return get_max_created(SequentialOpenDistribution.objects.filter(module_id=self.kwargs.get('module_id')))
+
     @raise_404_if_none
     def get_queryset(self):
         """Select the view count for a specific module"""
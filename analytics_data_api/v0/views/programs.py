@@ -1,7 +1,3 @@
-from functools import reduce as functools_reduce
-
-from django.db.models import Q
-
 from analytics_data_api.v0 import models, serializers
 from analytics_data_api.v0.views import APIListView
 
@@ -60,6 +56,3 @@ class ProgramsView(APIListView):
         field_dict['created'] = max(model.created, field_dict['created']) if field_dict['created'] else model.created
 
         return field_dict
-
-    def get_query(self):
-        return functools_reduce(lambda q, item_id: q | Q(program_id=item_id), self.ids, Q())
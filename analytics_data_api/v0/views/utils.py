@@ -1,6 +1,15 @@
 """Utilities for view-level API logic."""
 
 
+from functools import lru_cache
+from hashlib import md5
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Max
 from django.http import Http404
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey
@@ -18,6 +27,93 @@ def split_query_argument(argument):
     return None
 
 
+def batched(items, batch_size):
+    """
+    Yields successive lists of at most `batch_size` elements from `items`.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@lru_cache(maxsize=None)
+def get_model_field_names(model):
+    """
+    Returns the names of the fields of `model`, which are resolved once per model.
+    """
+    return [field.name for field in model._meta.get_fields()]  # pylint: disable=protected-access
+
+
+def get_max_created_cache_key(queryset):
+    """Returns the cache key of the most recent `created` timestamp of `queryset`, or None if it matches nothing."""
+    try:
+        query = str(queryset.query)
+    except EmptyResultSet:
+        return None
+    return 'max_created:{}'.format(md5(f'{queryset.db}|{query}'.encode('utf-8')).hexdigest())
+
+
+def get_max_created(queryset):
+    """
+    Returns the most recent `created` timestamp of the rows in `queryset`, or None if it is empty.
+
+    The timestamp only changes when the pipeline loads new rows, so it is cached for LAST_MODIFIED_CACHE_TIMEOUT
+    seconds in the LAST_MODIFIED_CACHE_ALIAS cache, keyed on the query, rather than aggregated on every request.
+    """
+    timeout = getattr(settings, 'LAST_MODIFIED_CACHE_TIMEOUT', 60)
+    key = get_max_created_cache_key(queryset) if timeout else None
+    if key is None:
+        return queryset.aggregate(max_created=Max('created'))['max_created']
+
+    cache = caches[getattr(settings, 'LAST_MODIFIED_CACHE_ALIAS', DEFAULT_CACHE_ALIAS)]
+    # The timestamp is cached in a tuple, so that an empty queryset is cached as well.
+    cached = cache.get(key)
+    if cached is None:
+        cached = (queryset.aggregate(max_created=Max('created'))['max_created'],)
+        cache.set(key, cached, timeout)
+    return cached[0]
+
+
+def clear_max_created(queryset):
+    """Forgets the cached most recent `created` timestamp of `queryset`, e.g. once newer rows have been read."""
+    key = get_max_created_cache_key(queryset)
+    if key is not None:
+        caches[getattr(settings, 'LAST_MODIFIED_CACHE_ALIAS', DEFAULT_CACHE_ALIAS)].delete(key)
+
+
+def pivot_counts(rows, columns, column_indexes, default_index=None, totals=()):
+    """
+    Pivots `rows` of (course_id, date, created, category, count, *total_values) tuples, sorted by course and
+    date, into one dict per course and date holding the summed count of each of `columns`, the most recent
+    created timestamp, and the sum of each of the `totals` values.
+
+    `column_indexes` maps each category to the index of its column in `columns`. Counts of other categories
+    are added to the `default_index` column, or only to the totals if it is None.
+    """
+    for (course_id, date), group in groupby(rows, itemgetter(0, 1)):
+        counts = [0] * len(columns)
+        total_counts = [0] * len(totals)
+        created = None
+
+        for _, _, row_created, category, count, *total_values in group:
+            index = column_indexes.get(category, default_index)
+            if index is not None:
+                counts[index] += count
+            for total_index, value in enumerate(total_values):
+                total_counts[total_index] += value
+            created = max(created, row_created) if created else row_created
+
+        item = {'course_id': course_id, 'date': date, 'created': created}
+        item.update(zip(columns, counts))
+        item.update(zip(totals, total_counts))
+        yield item
+
+
 def raise_404_if_none(func):
     """
     Decorator for raising Http404 if function evaluation is falsey (e.g. empty queryset).
@@ -6,10 +6,11 @@ from rest_framework import generics
 
 from analytics_data_api.v0.models import VideoTimeline
 from analytics_data_api.v0.serializers import VideoTimelineSerializer
-from analytics_data_api.v0.views.utils import raise_404_if_none
+from analytics_data_api.v0.views import ResponseCacheMixin
+from analytics_data_api.v0.views.utils import get_max_created, raise_404_if_none
 
 
-class VideoTimelineView(generics.ListAPIView):
+class VideoTimelineView(ResponseCacheMixin, generics.ListAPIView):
     """
     Get the counts of users and views for a video.
 
@@ -31,6 +32,9 @@ class VideoTimelineView(generics.ListAPIView):
     serializer_class = VideoTimelineSerializer
     allow_empty = False
 
+    def get_last_modified(self):
+        return get_max_created(VideoTimeline.objects.filter(pipeline_video_id=self.kwargs.get('video_id')))
+
     @raise_404_if_none
     def get_queryset(self):
         """Select the view count for a specific module"""
@@ -76,6 +76,11 @@ DATABASES = {
 ELASTICSEARCH_LEARNERS_HOST = environ.get('ELASTICSEARCH_LEARNERS_HOST', None)
 ELASTICSEARCH_LEARNERS_INDEX = environ.get('ELASTICSEARCH_LEARNERS_INDEX', None)
 ELASTICSEARCH_LEARNERS_UPDATE_INDEX = environ.get('ELASTICSEARCH_LEARNERS_UPDATE_INDEX', None)
+# number of seconds the date of the last update of the learners index, read from the update index,
+# is cached for, in each process and in the ROSTER_LAST_UPDATED_CACHE_ALIAS entry of CACHES. The date is only
+# shared between workers if that cache's backend is (e.g. memcached), and can be up to twice the timeout old.
+ROSTER_LAST_UPDATED_CACHE_ALIAS = 'default'
+ROSTER_LAST_UPDATED_CACHE_TIMEOUT = 60
 
 # access credentials for signing requests to AWS.
 # For more information see http://docs.aws.amazon.com/general/latest/gr/signing_aws_api_requests.html
@@ -86,6 +91,10 @@ ELASTICSEARCH_AWS_SECRET_ACCESS_KEY = None
 ELASTICSEARCH_CONNECTION_CLASS = None
 # only needed with BotoHttpConnection, e.g. 'us-east-1'
 ELASTICSEARCH_CONNECTION_DEFAULT_REGION = None
+# number of learners read per scroll request, and time each scroll is kept open between them,
+# when exporting all the learners of a course as CSV (learners/?export=true)
+ELASTICSEARCH_LEARNERS_EXPORT_BATCH_SIZE = 1000
+ELASTICSEARCH_LEARNERS_EXPORT_SCROLL = '1m'
 ########## END ELASTICSEARCH CONFIGURATION
 
 ########## GENERAL CONFIGURATION
@@ -374,6 +383,57 @@ DEFAULT_PAGE_SIZE = 25
 MAX_PAGE_SIZE = 100
 AGGREGATE_PAGE_SIZE = 10
 
+# Maximum number of IDs looked up in a single IN clause by the list endpoints
+# (e.g. course_summaries/ and programs/). Larger ID lists are split into batches.
+BULK_ID_LOOKUP_BATCH_SIZE = 500
+
+# Serve course_summaries/ from aggregated summaries stored in the COURSE_SUMMARIES_SNAPSHOT_CACHE_ALIAS entry
+# of CACHES, keyed on the time the summaries were last loaded (cached for LAST_MODIFIED_CACHE_TIMEOUT seconds).
+# The snapshot of a new load is built by the first request that sees it, or by the warm_course_summaries
+# management command, which should run after each pipeline load. Use a cache shared between workers
+# (e.g. memcached), since each worker otherwise builds and holds its own snapshot.
+COURSE_SUMMARIES_SNAPSHOT_ENABLED = False
+COURSE_SUMMARIES_SNAPSHOT_CACHE_ALIAS = 'default'
+COURSE_SUMMARIES_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+# Sum the course_summaries/ counts per course and enrollment mode in the database (GROUP BY course_id),
+# rather than fetching a row per course and mode and summing them in Python.
+COURSE_SUMMARIES_AGGREGATE_IN_DATABASE = False
+
+# Serve courses/{course_id}/problems/ from the problem submission aggregates, which are rebuilt from
+# answer_distribution by the build_problem_submission_aggregates management command after each pipeline load,
+# rather than aggregating answer_distribution on every request. The command creates the problem_submission_aggregate
+# table in the analytics database the first time it runs, so run it before enabling this.
+PROBLEM_SUBMISSION_AGGREGATES_ENABLED = False
+
+# Seconds for which each process keeps the introspected columns of the analytics database tables (e.g. whether
+# answer_distribution counts first and last attempts), before introspecting them again. None keeps them until
+# the process exits.
+ANALYTICS_SCHEMA_CACHE_TIMEOUT = 60 * 60
+
+# Stream the JSON and CSV responses of list endpoints (e.g. course_summaries/ and programs/)
+# when no IDs are given, and of the per-module distributions of a course (e.g.
+# courses/{course_id}/grade_distribution/) and of problems/answer_distribution/, rather than building the full list
+# in memory before responding.
+STREAM_UNFILTERED_LIST_RESPONSES = False
+
+# Add ETag and Last-Modified headers, derived from when the pipeline last loaded the requested data,
+# to the responses of GET requests to the v0 views, and answer conditional ones with a 304 if the data is unchanged.
+CONDITIONAL_RESPONSES_ENABLED = False
+
+# How long (in seconds) the time the pipeline last loaded a view's data is cached, and in which entry of CACHES,
+# so that conditional and cached responses don't query it on every request. Newly loaded data may be
+# served this much later. A timeout of 0 queries it on every request.
+LAST_MODIFIED_CACHE_TIMEOUT = 60
+LAST_MODIFIED_CACHE_ALIAS = 'default'
+
+# Cache the serialized responses of the v0 views, keyed on the request and the time its data was last loaded.
+# Entries are stored in the RESPONSE_CACHE_ALIAS entry of CACHES. RESPONSE_CACHE_TIMEOUTS overrides the cache's
+# timeout (in seconds) by view class name, e.g. {'CourseSummariesView': 60 * 60 * 24}.
+RESPONSE_CACHE_ENABLED = False
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUTS = {}
+
 # Maximum number of GET/POST parameters that will be read before a
 # SuspiciousOperation (TooManyFieldsSent) is raised.
 # None indicates no maximum.
@@ -424,7 +484,19 @@ STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Serialized API responses (see RESPONSE_CACHE_ALIAS). Any Django cache backend can be used here, e.g.
+    # FileBasedCache, or memcached to share the cache between workers. MAX_ENTRIES bounds the locmem and
+    # file-based caches, which cull the oldest entries when full. The response_cache_stats command needs a
+    # cache shared with the workers, since their hits and misses are counted in it.
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
 }
 SOCIAL_AUTH_EDX_OAUTH2_KEY = "analytics_api-sso-key"
 SOCIAL_AUTH_EDX_OAUTH2_SECRET = "-sso-secret"
@@ -39,3 +39,6 @@ FTP_STORAGE_LOCATION = 'ftp://localhost:80/path'
 # Default settings for report download endpoint
 COURSE_REPORT_FILE_LOCATION_TEMPLATE = '/{course_id}_{report_name}.csv'
 COURSE_REPORT_DOWNLOAD_EXPIRY_TIME = 120
+
+# Tests load data between requests, so don't cache the time it was last loaded unless a test enables it.
+LAST_MODIFIED_CACHE_TIMEOUT = 0